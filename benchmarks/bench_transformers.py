@@ -0,0 +1,200 @@
+"""
+bench_transformers.py:  throughput and memory benchmarks for data_preparation.transformers
+
+Generates a synthetic frame, times fit and transform of every transformer (plus a representative FeatureUnion)
+and writes the results as JSON.  Times are the median of --repeat runs.  When a baseline file is given, any case
+that got slower (or used more memory) than the baseline by more than the tolerance is reported and the script exits
+with a non zero status.  Changes under --min-seconds / --min-bytes are treated as noise, whatever the percentage.
+
+    python -m benchmarks.bench_transformers --rows 1000000 --output bench.json
+    python -m benchmarks.bench_transformers --rows 1000000 --baseline bench.json
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import string
+import sys
+from datetime import datetime
+from timeit import default_timer
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.pipeline import FeatureUnion
+
+from data_preparation import transformers
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # Python 2: peak memory isn't recorded
+
+_MIN_SECONDS = 0.001 # smallest slow down reported as a regression
+_MIN_BYTES = 64 * 1024 # smallest memory increase reported as a regression
+
+
+def make_frame(rows, string_columns=4, numeric_columns=8, nan_density=0.1, string_length=12, seed=0):
+    """
+    Builds a synthetic frame with string columns s0..sn (random lowercase strings of 1 to string_length letters)
+    and float columns n0..nm.  nan_density of the cells in every column are NaN.
+    """
+    random_state = np.random.RandomState(seed)
+    letters = np.array(list(string.ascii_lowercase))
+    data = {}
+
+    # Draw a small pool of distinct strings and sample from it, so the label encoder sees realistic cardinality
+    pool_size = max(1, min(rows, 10000))
+    for col in range(string_columns):
+        lengths = random_state.randint(1, string_length + 1, size=pool_size)
+        pool = np.array([''.join(random_state.choice(letters, size=length)) for length in lengths], dtype=object)
+        values = pool[random_state.randint(0, pool_size, size=rows)]
+        values[random_state.rand(rows) < nan_density] = np.nan
+        data['s{}'.format(col)] = values
+
+    for col in range(numeric_columns):
+        values = random_state.randn(rows)
+        values[random_state.rand(rows) < nan_density] = np.nan
+        data['n{}'.format(col)] = values
+
+    return pd.DataFrame(data)
+
+
+def make_sparse(rows, columns=1000, density=0.01, seed=0):
+    """
+    Builds a random csr matrix, standing in for one hot encoder output
+    """
+    return sp.random(rows, columns, density=density, format='csr', random_state=np.random.RandomState(seed))
+
+
+def get_cases(frame, sparse_matrix):
+    """
+    Returns (name, transformer, X) for each benchmark case
+    """
+    string_cols = [col for col in frame.columns if col.startswith('s')]
+    numeric_cols = [col for col in frame.columns if col.startswith('n')]
+    numeric_values = frame[numeric_cols].values
+
+    union = FeatureUnion([('nan_count', transformers.NaNCountTransformer()),
+                          ('letter_count', transformers.LetterCountTransformer(string_cols)),
+                          ('letters', transformers.LetterExtractionTransformer(string_cols, as_codes=True)),
+                          ('numerics', transformers.ColumnExtractor(numeric_cols, as_array=True))])
+
+    return [('NaNCountTransformer', transformers.NaNCountTransformer(), frame),
+            ('NanToZeroTransformer', transformers.NanToZeroTransformer(), numeric_values),
+            ('ColumnExtractor', transformers.ColumnExtractor(numeric_cols), frame),
+            ('LetterExtractionTransformer', transformers.LetterExtractionTransformer(string_cols), frame),
+            ('LetterExtractionTransformer[as_codes]', transformers.LetterExtractionTransformer(string_cols, as_codes=True), frame),
+            ('MultiColumnLabelEncoder', transformers.MultiColumnLabelEncoder(string_cols), frame),
+            ('LetterCountTransformer', transformers.LetterCountTransformer(string_cols), frame),
+            ('DenseTransformer', transformers.DenseTransformer(), sparse_matrix),
+            ('FeatureUnion', union, frame)]
+
+
+def measure(func, repeat):
+    """
+    Calls func repeat times and returns the median wall time (seconds), then calls it once more under tracemalloc
+    (which slows it down, so it isn't timed) and returns the peak traced memory (bytes)
+    """
+    timings = []
+    for run in range(repeat):
+        start = default_timer()
+        func()
+        timings.append(default_timer() - start)
+
+    peak_memory = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return float(np.median(timings)), peak_memory
+
+
+def run_benchmarks(rows, string_columns, numeric_columns, nan_density, string_length, repeat):
+    """
+    Runs every case and returns the results as a json serializable dict
+    """
+    frame = make_frame(rows, string_columns, numeric_columns, nan_density, string_length)
+    sparse_matrix = make_sparse(rows)
+
+    results = {}
+    for name, transformer, X in get_cases(frame, sparse_matrix):
+        fit_time, fit_memory = measure(lambda: transformer.fit(X), repeat)
+        transform_time, transform_memory = measure(lambda: transformer.transform(X), repeat)
+        results[name] = {'fit_seconds': fit_time, 'fit_peak_bytes': fit_memory,
+                         'transform_seconds': transform_time, 'transform_peak_bytes': transform_memory,
+                         'rows_per_second': rows / transform_time if transform_time else None}
+        print('{:<40} fit {:>9.4f}s  transform {:>9.4f}s'.format(name, fit_time, transform_time))
+
+    return {'run_time_stamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'parameters': {'rows': rows, 'string_columns': string_columns, 'numeric_columns': numeric_columns,
+                           'nan_density': nan_density, 'string_length': string_length, 'repeat': repeat},
+            'results': results}
+
+
+def find_regressions(current, baseline, tolerance, min_seconds=_MIN_SECONDS, min_bytes=_MIN_BYTES):
+    """
+    Compares two result dicts and returns a list of (case, metric, baseline value, current value)
+    for every time or memory metric that grew by more than tolerance (a fraction, e.g. 0.2 for 20%)
+    :param min_seconds: time increases smaller than this are ignored, they are timer noise on sub millisecond cases
+    :param min_bytes: memory increases smaller than this are ignored
+    """
+    floors = {'fit_seconds': min_seconds, 'transform_seconds': min_seconds,
+              'fit_peak_bytes': min_bytes, 'transform_peak_bytes': min_bytes}
+    regressions = []
+    for name, metrics in sorted(current['results'].items()):
+        baseline_metrics = baseline['results'].get(name)
+        if baseline_metrics is None:
+            continue
+        for metric, floor in sorted(floors.items()):
+            old, new = baseline_metrics.get(metric), metrics.get(metric)
+            if old and new and new > old * (1 + tolerance) and new - old >= floor:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the transformers in data_preparation.transformers')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--string-columns', type=int, default=4)
+    parser.add_argument('--numeric-columns', type=int, default=8)
+    parser.add_argument('--nan-density', type=float, default=0.1)
+    parser.add_argument('--string-length', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats, the median is kept')
+    parser.add_argument('--output', help='file to write the json results to')
+    parser.add_argument('--baseline', help='json results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slow down before flagging a regression')
+    parser.add_argument('--min-seconds', type=float, default=_MIN_SECONDS,
+                        help='slow downs smaller than this are not flagged, whatever the tolerance')
+    parser.add_argument('--min-bytes', type=int, default=_MIN_BYTES,
+                        help='memory increases smaller than this are not flagged, whatever the tolerance')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.rows, args.string_columns, args.numeric_columns, args.nan_density,
+                             args.string_length, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, sort_keys=True, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['parameters'] != current['parameters']:
+            print('Warning: baseline was run with different parameters {}'.format(baseline['parameters']))
+        regressions = find_regressions(current, baseline, args.tolerance, args.min_seconds, args.min_bytes)
+        for name, metric, old, new in regressions:
+            print('REGRESSION {} {}: {:.4g} -> {:.4g}'.format(name, metric, old, new))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
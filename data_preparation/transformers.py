@@ -5,148 +5,518 @@ transformers.py:  a library of transformer and transformer like classes that can
 import pandas as pd
 from sklearn.base import TransformerMixin
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+import scipy.sparse as sp
 from sklearn.pipeline import FeatureUnion, Pipeline
+from collections import OrderedDict
+import hashlib
 import json
+import numbers
+import os
+import tempfile
+import threading
 
+try:
+    from joblib import Parallel, delayed
+except ImportError:
+    # older versions of scikit-learn ship joblib with them
+    from sklearn.externals.joblib import Parallel, delayed
 
-class NaNCountTransformer(TransformerMixin):
+
+class ChunkedTransformerMixin(TransformerMixin):
+    """
+    Adds transform_chunks to a transformer so it can be run over data that doesn't fit in memory.
+    The transformer has to be fit beforehand (typically on a sample or the training data).
+    """
+
+    def transform_chunks(self, chunks, **transform_params):
+        """
+        Generator that transforms an iterable of DataFrames (e.g. pd.read_csv(..., chunksize=n)) one chunk at a time
+        """
+        return transform_chunks(self, chunks, **transform_params)
+
+
+class NaNCountTransformer(ChunkedTransformerMixin):
     """
     This counts the number of NaN per row and provides a raw count
     and percentage
+
+    The counts are computed with a single null check over the frame and written straight into
+    a preallocated two column array.
+    @param columns: optional list of columns to count NaN in.  If None, all columns are used
+    @param dtype: dtype of the output.  Has to be a floating point dtype, as it holds the fraction
     """
 
+    def __init__(self, columns=None, dtype=np.float32):
+        self.columns = columns
+        self.dtype = dtype
+
     def transform(self, X, **transform_params):
-        nan_metrics = pd.DataFrame(len(X.columns)-X.count(axis=1))
-        nan_metrics = pd.concat([nan_metrics, pd.DataFrame(nan_metrics[0]/len(X.columns))], axis=1)
-        return nan_metrics
+        if self.columns is not None:
+            X = X[self.columns]
+
+        if not np.issubdtype(np.dtype(self.dtype), np.floating):
+            raise ValueError('NaNCountTransformer dtype has to be a floating point dtype, got {}'.format(self.dtype))
+
+        nan_metrics = np.empty((len(X), 2), dtype=self.dtype)
+        np.sum(pd.isnull(X).values, axis=1, dtype=self.dtype, out=nan_metrics[:, 0])
+        np.divide(nan_metrics[:, 0], len(X.columns), out=nan_metrics[:, 1])
+        return pd.DataFrame(nan_metrics, index=X.index, copy=False)
 
     def fit(self, X, y=None, **fit_params):
         return self
 
 
-class NanToZeroTransformer(TransformerMixin):
+class NanToZeroTransformer(ChunkedTransformerMixin):
     """
-    Accepts an array of values and converts NaN to 0
+    Accepts an array of values and converts NaN to 0 (and infinity to the largest finite value, like np.nan_to_num)
+    Arrays, DataFrames and sparse matrices keep their type and dtype.  Sparse matrices only have their stored values touched.
+    @param copy: if False, X is filled in place instead of being copied first
     """
+    def __init__(self, copy=True):
+        self.copy = copy
+
     def transform(self, X, **transform_params):
-        return np.nan_to_num(X)
+        if sp.issparse(X):
+            if X.format not in ('csr', 'csc', 'coo', 'bsr'):
+                X = X.tocsr()
+            elif self.copy:
+                X = X.copy()
+            _nan_to_num_inplace(X.data)
+            return X
+
+        if isinstance(X, pd.DataFrame):
+            if self.copy:
+                X = X.copy()
+            for position in range(X.shape[1]):
+                values = X.iloc[:, position].values
+                if _is_float_array(values):
+                    if not values.flags.writeable:
+                        values = values.copy()
+                    X.iloc[:, position] = _nan_to_num_inplace(values)
+            return X
+
+        if not isinstance(X, np.ndarray):
+            X = np.array(X)
+        elif self.copy:
+            X = X.copy()
+        return _nan_to_num_inplace(X)
 
     def fit(self, X, y=None, **fit_params):
         return self
 
 
-class ColumnExtractor(TransformerMixin):
+def _is_float_array(values):
+    return isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.floating)
+
+
+def _nan_to_num_inplace(values):
+    """
+    In place version of np.nan_to_num for float arrays.  Other arrays are returned untouched.
+    """
+    if _is_float_array(values):
+        info = np.finfo(values.dtype)
+        values[np.isnan(values)] = 0
+        values[np.isposinf(values)] = info.max
+        values[np.isneginf(values)] = info.min
+    return values
+
+
+class ColumnExtractor(ChunkedTransformerMixin):
     """
     Slices a dataframe and returns specified columns
     (mirrored from Zac Stewart)
 
+    The column positions are looked up once in fit.  Contiguous columns are returned as a slice of X,
+    which pandas (and numpy for as_array) can serve as a view rather than a copy.
+
         :param cols_to_return: list of columns
+        :param as_array: if True, returns the ndarray of the selected columns instead of a DataFrame.  This is only a
+                         view when the selected columns share a dtype (e.g. all float columns)
     """
 
-    def __init__(self, cols_to_return):
+    def __init__(self, cols_to_return, as_array=False):
         self.cols = cols_to_return
+        self.as_array = as_array
 
     def transform(self, X, **transform_params):
-        return pd.DataFrame(X[self.cols])
+        indexer = _positions_to_indexer(self._get_positions(X))
+        if self.as_array:
+            # Columns are selected before converting, so the array has the dtype of the selected columns only
+            return X.iloc[:, indexer].values
+        return X.iloc[:, indexer]
 
     def fit(self, X, y=None, **fit_params):
+        self.positions_ = self._lookup_positions(X)
         return self
 
+    def _get_positions(self, X):
+        """
+        Returns the positions found in fit, as long as X still has the columns there
+        """
+        positions = getattr(self, 'positions_', None)
+        if positions is not None and len(positions) and positions.max() < len(X.columns) \
+                and np.array_equal(X.columns.values.take(positions), self._cols_list()):
+            return positions
+        return self._lookup_positions(X)
+
+    def _lookup_positions(self, X):
+        positions = X.columns.get_indexer(self._cols_list())
+        if (positions == -1).any():
+            raise KeyError('Columns not found: {}'.format([col for col, pos in zip(self._cols_list(), positions) if pos == -1]))
+        return positions
+
+    def _cols_list(self):
+        return [self.cols] if np.ndim(self.cols) == 0 else list(self.cols)
 
-class LetterExtractionTransformer(TransformerMixin):
+
+def _positions_to_indexer(positions):
+    """
+    Returns a slice when the positions are contiguous and increasing (so the selection can be a view),
+    otherwise the positions themselves
+    """
+    if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+        return slice(positions[0], positions[0] + len(positions))
+    return positions
+
+
+class LetterExtractionTransformer(ChunkedTransformerMixin):
     """
     Accepts a column name and creates an m x n array where m is number of rows
     and n is max(length of column) populated by letters (or empty where shorter)
 
-    @:param columns_to_extract: the columns to be 'split'
+    Each column is converted in one pass to a fixed width matrix of unicode code points
+    (see string_to_code_matrix), so no python lists are built per cell.
+
+    @:param columns: the columns to be 'split'
+    @:param max_width: optional fixed number of letters kept per column.  Longer strings are truncated.
+                       Set this when using transform_chunks so every chunk has the same number of columns.
+    @:param pad_value: code used where a string is shorter than the width (only used when as_codes is True)
+    @:param as_codes: if True, returns a compact numeric array of code points instead of a DataFrame of letters
+    @:param n_jobs: number of columns to process in parallel (see map_columns)
+    @:param backend: joblib backend used when n_jobs != 1 ('threading' or 'multiprocessing')
     """
-    def __init__(self, columns):
+    def __init__(self, columns, max_width=None, pad_value=0, as_codes=False, n_jobs=1, backend='threading'):
         self.columns = columns
+        self.max_width = max_width
+        self.pad_value = pad_value
+        self.as_codes = as_codes
+        self.n_jobs = n_jobs
+        self.backend = backend
 
     def transform(self, X, **transform_params):
-        return pd.concat([pd.DataFrame(map(self.my_list, X[col]))
-                          for col in self.columns], axis=1, ignore_index=True)
+        matrices = map_columns(_extract_letters, X, self.columns, self.n_jobs, self.backend,
+                               self.max_width, self.pad_value, self.as_codes)
 
+        if self.as_codes:
+            return np.hstack(matrices)
+
+        return pd.DataFrame(np.hstack(matrices))
 
     def fit(self, X, y=None, **fit_params):
         return self
 
-    def my_list(self, x):
-        if type(x) == str:
-            return list(x)
-        return []
 
-class MultiColumnLabelEncoder(TransformerMixin):
+def _extract_letters(series, max_width, pad_value, as_codes):
+    """
+    Worker for LetterExtractionTransformer:  returns either the padded code points or the letters of one column
+    """
+    codes, lengths = string_to_code_matrix(series, max_width)
+    pad_mask = _pad_mask(codes, lengths)
+
+    if not as_codes:
+        letters = codes.view('U1').astype(object)
+        letters[pad_mask] = None
+        return letters
+
+    if pad_value < 0:
+        # code points never exceed 0x10FFFF so the signed view is safe
+        codes = codes.view(np.int32)
+    if pad_value != 0:
+        codes[pad_mask] = pad_value
+    return codes
+
+
+def string_to_code_matrix(series, max_width=None):
+    """
+    Converts a series of strings to an m x n uint32 matrix of unicode code points, where n is the
+    longest string in the series (or max_width if given).  Shorter strings (and non strings) are padded with 0.
+    :param series: pandas Series of strings
+    :param max_width: optional fixed width of the matrix
+    :return (codes, lengths): the code point matrix and the number of letters used in each row
+    """
+    lengths = string_lengths(series)
+    is_string = ~np.isnan(lengths)
+    lengths = np.where(is_string, lengths, 0).astype(np.int64)
+
+    if max_width is not None:
+        width = max_width
+        lengths = np.minimum(lengths, width)
+    else:
+        width = int(lengths.max()) if len(lengths) else 0
+
+    if width == 0:
+        return np.zeros((len(series), 0), dtype=np.uint32), lengths
+
+    values = np.where(is_string, np.asarray(series.values, dtype=object), u'')
+    codes = values.astype('U{}'.format(width)).view(np.uint32).reshape(len(series), width)
+    return codes, lengths
+
+
+def string_lengths(series):
+    """
+    Returns a float array with the length of each string in the series and NaN for anything that isn't a string
+    """
+    try:
+        lengths = series.str.len()
+    except AttributeError:
+        # The .str accessor is only available when the column holds strings
+        return np.full(len(series), np.nan)
+    # .str.len() also counts the items of list and tuple cells
+    is_string = np.asarray(series.map(_is_string), dtype=bool)
+    return np.where(is_string, np.asarray(lengths, dtype=np.float64), np.nan)
+
+
+def _pad_mask(codes, lengths):
+    """
+    Returns a boolean mask of the positions in a code point matrix that are beyond the end of each string
+    """
+    return np.arange(codes.shape[1]) >= lengths[:, np.newaxis]
+
+
+def map_columns(func, X, columns, n_jobs=1, backend='threading', *args):
+    """
+    Calls func(X[col], *args) for each of the columns and returns the results in column order.
+    When n_jobs != 1 the columns are fanned out across a joblib pool.  Only the column a worker needs is sent
+    to it, and with the 'multiprocessing' backend joblib memory maps large numeric arrays rather than pickling
+    them to every worker.  String (object) columns can't be memory mapped, so threads are usually the better
+    choice for those.
+    :param func: module level function (it has to be picklable for the process backend)
+    :param X: DataFrame
+    :param columns: list of columns to process
+    :param n_jobs: number of workers.  -1 uses all cores, 1 runs serially without a pool
+    :param backend: 'threading' or 'multiprocessing'
+    """
+    if n_jobs == 1:
+        return [func(X[col], *args) for col in columns]
+    return Parallel(n_jobs=n_jobs, backend=backend)(delayed(func)(X[col], *args) for col in columns)
+
+class MultiColumnLabelEncoder(ChunkedTransformerMixin):
     """
     Accepts a list of columns and label encodes them.
-    Copied from http://stackoverflow.com/questions/24458645/label-encoding-across-multiple-columns-in-scikit-learn
-    @param columns: array of columns to encode
+    Originally copied from http://stackoverflow.com/questions/24458645/label-encoding-across-multiple-columns-in-scikit-learn
+    The categories are learned once in fit and stored, so the same codes are used for train, test and
+    any later scoring batch (and the fitted encoder can be persisted and reused).
+    @param columns: array of columns to encode.  If None, all columns are encoded
+    @param unknown_value: code used for categories that weren't seen during fit
+    @param n_jobs: number of columns to process in parallel (see map_columns)
+    @param backend: joblib backend used when n_jobs != 1 ('threading' or 'multiprocessing')
     """
-    def __init__(self,columns = None):
+    def __init__(self, columns=None, unknown_value=-1, n_jobs=1, backend='threading'):
         self.columns = columns # array of column names to encode
+        self.unknown_value = unknown_value
+        self.n_jobs = n_jobs
+        self.backend = backend
 
     def fit(self, X, y=None, **fit_params):
-        return self # not relevant here
+        """
+        Learns the sorted categories of each column (the codes match what LabelEncoder would produce)
+        """
+        columns = list(self.columns if self.columns is not None else X.columns)
+        categories = map_columns(_learn_categories, X, columns, self.n_jobs, self.backend)
+        self.categories_ = dict(zip(columns, categories))
+        return self
 
     def transform(self, X, **transform_params):
         """
         Transforms columns of X specified in self.columns using
-        LabelEncoder(). If no columns specified, transforms all
-        columns in X.
+        the categories learned in fit. If no columns specified, transforms all
+        columns seen in fit.
         """
-        output = X.copy()
-        if self.columns is not None:
-            for col in self.columns:
-                output[col] = LabelEncoder().fit_transform(output[col])
+        if not hasattr(self, 'categories_'):
+            raise Exception('MultiColumnLabelEncoder has to be fit before calling transform')
+
+        columns = list(self.categories_)
+        # Each worker is only sent its own column's categories, not the whole dict
+        calls = [(X[col], self.categories_[col], self.unknown_value) for col in columns]
+        if self.n_jobs == 1:
+            encoded = [_encode_labels(*call) for call in calls]
         else:
-            for colname,col in output.iteritems():
-                output[colname] = LabelEncoder().fit_transform(col)
+            encoded = Parallel(n_jobs=self.n_jobs, backend=self.backend)(delayed(_encode_labels)(*call) for call in calls)
+
+        output = X.copy()
+        for col, codes in zip(columns, encoded):
+            output[col] = codes
         return output
 
 
-class LetterCountTransformer(TransformerMixin):
+def _learn_categories(series):
+    """
+    Worker for MultiColumnLabelEncoder.fit
+    """
+    return pd.Index(pd.unique(series)).sort_values()
+
+
+def _encode_labels(series, categories, unknown_value):
+    """
+    Worker for MultiColumnLabelEncoder.transform
+    :param categories: the sorted categories learned for this column
+    """
+    codes = categories.get_indexer(series)
+    if unknown_value != -1:
+        codes[codes == -1] = unknown_value
+    return codes
+
+
+class LetterCountTransformer(ChunkedTransformerMixin):
     """
     Gets the count of letters
+    The counts are computed a column at a time with the pandas string methods (see string_lengths)
+    and written into one preallocated array.
     @ param columns: list of columns to get counts for
+    @ param dtype: dtype of the output.  Non strings are NaN for float dtypes and 0 for integer dtypes
+    @ param n_jobs: number of columns to process in parallel (see map_columns)
+    @ param backend: joblib backend used when n_jobs != 1 ('threading' or 'multiprocessing')
     """
 
-    def __init__(self, columns=None):
+    def __init__(self, columns=None, dtype=np.float32, n_jobs=1, backend='threading'):
         self.columns = columns  # array of column names to encode
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        self.backend = backend
 
     def transform(self, X, **transform_params):
-        return pd.concat([pd.DataFrame(map(self.get_len, X[col])) for col in self.columns], axis=1, ignore_index=True)
+        letter_counts = np.empty((len(X), len(self.columns)), dtype=self.dtype)
+        for position, lengths in enumerate(map_columns(string_lengths, X, self.columns, self.n_jobs, self.backend)):
+            if not np.issubdtype(letter_counts.dtype, np.floating):
+                lengths = np.nan_to_num(lengths)
+            letter_counts[:, position] = lengths
+        return pd.DataFrame(letter_counts, copy=False)
 
     def fit(self, X, y=None, **fit_params):
         return self
 
-    def get_len(self, some_string):
-        if isinstance(some_string, basestring):
-            return len(some_string)
-        return np.NaN
 
-class DenseTransformer(TransformerMixin):
+_MEMMAP_BLOCK_BYTES = 64 * 1024 * 1024 #64 MB per dense block when block_size isn't set for a memmap output
+
+
+class DenseTransformer(ChunkedTransformerMixin):
     """
-    Converts a sparse matrix to a dense one
+    Converts a sparse matrix to a dense one (a plain ndarray rather than np.matrix)
     tip o'the hat to https://github.com/davismj/receipt-classifier/blob/master/DenseTransformer.py
+
+    When block_size is set, the matrix is densified block_size rows at a time into a preallocated array,
+    so only the output (and one block) is ever held.  With memmap_dir, the output is a disk backed np.memmap
+    in that directory, so it can be bigger than RAM.  The memmap files aren't removed, clean up the directory when done.
+    @param block_size: number of rows to densify at a time.  None densifies everything at once, or with memmap_dir
+                       as many rows as fit in 64 MB
+    @param dtype: dtype of the output.  None keeps the dtype of X
+    @param memmap_dir: optional scratch directory for a memory mapped output
     """
 
+    def __init__(self, block_size=None, dtype=None, memmap_dir=None):
+        self.block_size = block_size
+        self.dtype = dtype
+        self.memmap_dir = memmap_dir
+
     def transform(self, X, **transform_params):
-        return X.todense()
+        if not sp.issparse(X):
+            return np.asarray(X, dtype=self.dtype)
+
+        dtype = self.dtype or X.dtype
+        if self.block_size is None and self.memmap_dir is None:
+            return X.toarray().astype(dtype, copy=False)
+
+        ret = self._allocate(X.shape, dtype)
+        X = X.tocsr()
+        block_size = self.block_size or max(1, _MEMMAP_BLOCK_BYTES // max(1, X.shape[1] * np.dtype(dtype).itemsize))
+        for start in range(0, X.shape[0], block_size):
+            ret[start:start + block_size] = X[start:start + block_size].toarray()
+        return ret
 
     def fit(self, X, y=None, **fit_params):
         return self
 
+    def _allocate(self, shape, dtype):
+        if self.memmap_dir is None:
+            return np.empty(shape, dtype=dtype)
+
+        handle, file_name = tempfile.mkstemp(suffix='.dat', prefix='dense_', dir=self.memmap_dir)
+        os.close(handle)
+        return np.memmap(file_name, dtype=dtype, mode='w+', shape=shape)
+
+
+def transform_chunks(transformer, chunks, **transform_params):
+    """
+    Generator that runs a fitted transformer (including Pipelines and FeatureUnions) over an iterable of
+    DataFrames one chunk at a time, so peak memory is bounded by the chunk size rather than the file size.
+    :param transformer: fitted transformer
+    :param chunks: iterable of DataFrames
+    """
+    for chunk in chunks:
+        yield transformer.transform(chunk, **transform_params)
+
+
+def transform_csv(transformer, file_path, chunksize=100000, **read_csv_params):
+    """
+    Generator that reads a csv file chunksize rows at a time and yields the transformed chunks
+    :param transformer: fitted transformer
+    :param file_path: csv file to read
+    :param chunksize: number of rows per chunk
+    :param read_csv_params: passed along to pd.read_csv
+    """
+    return transform_chunks(transformer, pd.read_csv(file_path, chunksize=chunksize, **read_csv_params))
+
 
-def encode_transformer(label, transformer):
+def write_chunks(chunks, path_or_buf, header=True, **to_csv_params):
+    """
+    Streams transformed chunks (DataFrames, arrays or sparse matrices) to a csv file without
+    ever concatenating them.  The header is only written with the first chunk.
+    :param chunks: iterable of transformed chunks (e.g. the output of transform_csv)
+    :param path_or_buf: file name or open file handle
+    :return number of rows written
+    """
+    if not hasattr(path_or_buf, 'write'):
+        with open(path_or_buf, 'w') as f:
+            return write_chunks(chunks, f, header=header, **to_csv_params)
+
+    to_csv_params.setdefault('index', False)
+    row_count = 0
+    for chunk_num, chunk in enumerate(chunks):
+        if hasattr(chunk, 'toarray'):
+            chunk = chunk.toarray()
+        pd.DataFrame(chunk).to_csv(path_or_buf, header=header and chunk_num == 0, **to_csv_params)
+        row_count += chunk.shape[0]
+    return row_count
+
+
+_MAX_VARS_BYTES = 10 * 1024 * 1024 #10 MB of vars per transformer in the encoded tree
+_MAX_VALUE_BYTES = 1024 * 1024 #1 MB.  Larger values are summarized
+_TREE_CACHE_SIZE = 1024 # unfitted transformer trees kept by create_transformer_tree
+
+_tree_cache = OrderedDict()
+_tree_cache_lock = threading.Lock()
+
+
+def encode_transformer(label, transformer, fp=None):
     """
     Returns a string representation of the transformer.  Nested transformers (as in the case of pipelines, FeatureUnions, etc) are iteratively parsed into a tree representation which is then converted to JSON.
+    :param fp: if passed, the JSON is streamed to this file like object (a chunk at a time) and nothing is returned
+    """
+    return encode_transformer_tree(create_transformer_tree(label, transformer), fp)
+
+
+def encode_transformer_tree(transformer_tree, fp=None):
+    """
+    Converts a tree from create_transformer_tree to JSON (see encode_transformer)
     """
-    transformer_tree = create_transformer_tree(label, transformer)
-    return json.dumps(transformer_tree, default=lambda x: str(x), sort_keys=True, indent=4)
+    chunks = json.JSONEncoder(default=lambda x: str(x), sort_keys=True, indent=4).iterencode(transformer_tree)
+    if fp is None:
+        return ''.join(chunks)
+    for chunk in chunks:
+        fp.write(chunk)
 
 
-def create_transformer_tree(label, transformer):
+def create_transformer_tree(label, transformer, max_vars_bytes=_MAX_VARS_BYTES, max_value_bytes=_MAX_VALUE_BYTES):
     """
     Takes either a pipeline or a gridsearch transformer and converts it
     the labels have an A, B, C so that they can be easily ordered
@@ -154,7 +524,37 @@ def create_transformer_tree(label, transformer):
     ['B. transformer'] - the transformer itself
     ['C. children'] - list of children transformers
     ['D. vars'] - the variable output (parameter list)
+    Values in vars larger than max_value_bytes, or past max_vars_bytes in total, are replaced by a summary
+    (type, shape, dtype, length and for arrays a sha1 of the data) without being rendered.  Some classes (CountVectorizers, etc)
+    contain all of the context including Vocabulary.
+    Trees of unfitted transformers are cached (see _transformer_fingerprint) and shared between calls, so treat the
+    result as read only.
     """
+    fingerprint = _transformer_fingerprint(transformer)
+    if fingerprint is None:
+        return _create_transformer_tree(label, transformer, max_vars_bytes, max_value_bytes)
+
+    key = (label, max_vars_bytes, max_value_bytes, fingerprint)
+    with _tree_cache_lock:
+        ret = _tree_cache.pop(key, None)
+        if ret is not None:
+            _tree_cache[key] = ret
+            return ret
+
+    ret = _create_transformer_tree(label, transformer, max_vars_bytes, max_value_bytes)
+    with _tree_cache_lock:
+        _tree_cache[key] = ret
+        while len(_tree_cache) > _TREE_CACHE_SIZE:
+            _tree_cache.popitem(last=False)
+    return ret
+
+
+def clear_transformer_tree_cache():
+    with _tree_cache_lock:
+        _tree_cache.clear()
+
+
+def _create_transformer_tree(label, transformer, max_vars_bytes, max_value_bytes):
     ret = {}
     ret['A. label'] = label
     ret['B. transformer'] = type(transformer)
@@ -168,17 +568,174 @@ def create_transformer_tree(label, transformer):
     if child_enumerate:
         ret['C. children'] = []
         for order, (next_label, inner_transformer) in child_enumerate:
-            ret['C. children'].append(create_transformer_tree(next_label, inner_transformer))
+            ret['C. children'].append(create_transformer_tree(next_label, inner_transformer, max_vars_bytes, max_value_bytes))
     else:
-        the_vars = vars(transformer)
-        if len(str(the_vars)) <= (10 * 1024 * 1024): #10 MB.  This actually get's larger when you filter it through JSON.  What happens is that some classes (CountVectorizers, etc) contain all of the context including Vocabulary.
-            ret['D. vars'] = the_vars
-        else:
-            ret['D. vars'] = 'vars() too long.  You will have to load object and review manually'
+        ret['D. vars'] = _summarize_vars(vars(transformer), max_vars_bytes, max_value_bytes)
 
 
     if hasattr(transformer, 'estimator'):
         # Then we are probably in grid search:  Recursively call on the estimator
-        ret['E. Estimator'] = create_transformer_tree('{} nested_estimator'.format(label), transformer.estimator)
+        ret['E. Estimator'] = create_transformer_tree('{} nested_estimator'.format(label), transformer.estimator,
+                                                      max_vars_bytes, max_value_bytes)
 
     return ret
+
+
+def flatten_transformer_tree(transformer_tree, parent_path=None):
+    """
+    Generator of (path, transformer_class, parameter, value) tuples for a tree from create_transformer_tree:
+    one per node with parameter None, then one per var of the node.
+    path is the labels from the root joined with /, transformer_class the module qualified class name and
+    value is encoded with index_value.
+    """
+    path = transformer_tree['A. label'] if parent_path is None else '{}/{}'.format(parent_path, transformer_tree['A. label'])
+    transformer_class = class_name(transformer_tree['B. transformer'])
+    yield path, transformer_class, None, None
+    for parameter, value in sorted(transformer_tree.get('D. vars', {}).items()):
+        yield path, transformer_class, parameter, index_value(value)
+    for child in transformer_tree.get('C. children', []):
+        for row in flatten_transformer_tree(child, path):
+            yield row
+    if 'E. Estimator' in transformer_tree:
+        for row in flatten_transformer_tree(transformer_tree['E. Estimator'], path):
+            yield row
+
+
+def class_name(cls):
+    """
+    Returns the module qualified name of a class, as used by flatten_transformer_tree
+    """
+    return '{}.{}'.format(cls.__module__, cls.__name__)
+
+
+def index_value(value):
+    """
+    Encodes a parameter value for flatten_transformer_tree:  strings as they are, anything else as compact JSON
+    """
+    if isinstance(value, str) or _is_unicode(value):
+        return value
+    return json.dumps(value, sort_keys=True, default=lambda x: str(x), separators=(',', ':'))
+
+
+def _transformer_fingerprint(transformer):
+    """
+    Returns a hashable description of an unfitted transformer:  its class and its parameters (get_params, or vars for
+    classes without it), with nested transformers described the same way.  None when it can't be cached:  it, or
+    something nested in it, has been fit (has attributes ending in _) or has a parameter with no reliable description
+    (objects whose repr is just their address, functions, etc).
+    """
+    the_vars = getattr(transformer, '__dict__', None)
+    if the_vars is None or any(name.endswith('_') and not name.startswith('__') for name in the_vars):
+        return None
+    try:
+        params = transformer.get_params(deep=False) if hasattr(transformer, 'get_params') else the_vars
+    except Exception:
+        return None
+
+    ret = [type(transformer)]
+    try:
+        for name in sorted(params):
+            value = _value_fingerprint(params[name])
+            if value is None:
+                return None
+            ret.append((name, value))
+    except TypeError:
+        # e.g. dict keys that can't be sorted
+        return None
+    return tuple(ret)
+
+
+def _value_fingerprint(value):
+    if value is None or isinstance(value, (numbers.Real, np.generic, str, bytes)) or _is_unicode(value):
+        return (type(value), repr(value))
+    if isinstance(value, type):
+        return value
+    if isinstance(value, np.ndarray):
+        return _value_fingerprint(_array_summary(value)) if value.dtype != object else None
+    if isinstance(value, (list, tuple)):
+        ret = tuple(_value_fingerprint(item) for item in value)
+        return None if None in ret else (type(value), ret)
+    if isinstance(value, dict):
+        ret = tuple((_value_fingerprint(key), _value_fingerprint(value[key])) for key in sorted(value))
+        return None if any(None in item for item in ret) else (dict, ret)
+    if hasattr(value, 'fit') or hasattr(value, 'transform'):
+        return _transformer_fingerprint(value)
+    return None
+
+
+def _summarize_vars(the_vars, max_vars_bytes, max_value_bytes):
+    """
+    Returns the vars with large values summarized, stopping at max_vars_bytes in total (roughly, as encoded)
+    """
+    ret = {}
+    remaining = max_vars_bytes
+    for name in sorted(the_vars):
+        value, size = _summarize_value(the_vars[name], min(remaining, max_value_bytes))
+        ret[name] = value
+        remaining = max(remaining - size, 0)
+    return ret
+
+
+def _summarize_value(value, budget):
+    """
+    Returns (value or a summary of it, approximate encoded size).  Containers are measured item by item and
+    summarized as soon as they pass the budget, so large ones are never rendered in full.
+    """
+    if value is None or isinstance(value, (numbers.Real, np.generic)):
+        return value, 8
+    if isinstance(value, (str, bytes)) or _is_unicode(value):
+        if len(value) > budget:
+            return {'summary': type(value).__name__, 'length': len(value)}, 64
+        return value, len(value)
+    if isinstance(value, np.ndarray):
+        if value.nbytes > budget:
+            return _array_summary(value), 128
+        return value, value.nbytes
+    if sp.issparse(value) or isinstance(value, (pd.DataFrame, pd.Series)):
+        size = value.data.nbytes if sp.issparse(value) else int(np.sum(value.memory_usage(deep=False)))
+        if size > budget:
+            return {'summary': type(value).__name__, 'shape': list(value.shape)}, 64
+        return value, size
+    if isinstance(value, dict):
+        ret = {}
+        size = 2
+        for key, item in value.items():
+            ret[key], item_size = _summarize_value(item, budget - size)
+            size += item_size + len(str(key)) + 4
+            if size > budget:
+                return {'summary': type(value).__name__, 'length': len(value)}, 64
+        return ret, size
+    if isinstance(value, (list, tuple)):
+        ret = []
+        size = 2
+        for item in value:
+            summary, item_size = _summarize_value(item, budget - size)
+            ret.append(summary)
+            size += item_size + 2
+            if size > budget:
+                return {'summary': type(value).__name__, 'length': len(value)}, 64
+        return ret, size
+
+    # Anything else is rendered with str, as json.dumps(default=str) would
+    rendered = str(value)
+    if len(rendered) > budget:
+        return {'summary': type(value).__name__, 'length': len(rendered)}, 64
+    return rendered, len(rendered)
+
+
+def _array_summary(value):
+    ret = {'summary': type(value).__name__, 'shape': list(value.shape), 'dtype': str(value.dtype)}
+    if value.dtype != object:
+        ret['sha1'] = hashlib.sha1(np.ascontiguousarray(value).view(np.uint8)).hexdigest()
+    return ret
+
+
+def _is_string(value):
+    return isinstance(value, str) or _is_unicode(value)
+
+
+def _is_unicode(value):
+    try:
+        return isinstance(value, unicode)
+    except NameError:
+        return False
@@ -0,0 +1,135 @@
+"""
+data_loader.py:  loads the competition's train and test files using what Settings knows about the columns.
+
+Only record_pk, the features and (for train) the target are read.  String features become category columns and
+numeric features float32.  The first full load also writes a Parquet (or Feather) copy next to the CSV;
+later loads read that instead, until the CSV is modified.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from kaggle.settings import get_settings
+
+CACHE_PARQUET = 'parquet'
+CACHE_FEATHER = 'feather'
+
+_CACHE_EXTENSIONS = {CACHE_PARQUET: '.parquet', CACHE_FEATHER: '.feather'}
+
+
+def load_train(settings=None, chunksize=None, cache_format=CACHE_PARQUET):
+    """
+    Loads the train file (see load_csv)
+    :param settings: Settings.  Defaults to get_settings()
+    """
+    settings = settings or get_settings()
+    return load_csv(settings.train_file_path, settings, include_target=True, chunksize=chunksize,
+                    cache_format=cache_format)
+
+
+def load_test(settings=None, chunksize=None, cache_format=CACHE_PARQUET):
+    """
+    Loads the test file, which has no target (see load_csv)
+    :param settings: Settings.  Defaults to get_settings()
+    """
+    settings = settings or get_settings()
+    return load_csv(settings.test_file_path, settings, include_target=False, chunksize=chunksize,
+                    cache_format=cache_format)
+
+
+def load_csv(file_path, settings, include_target=True, chunksize=None, cache_format=CACHE_PARQUET):
+    """
+    Reads the columns listed in settings from the CSV, with their dtypes
+    :param include_target: read the target column as well
+    :param chunksize: if passed, an iterator of DataFrames of chunksize rows is returned.  Chunks are read straight from
+        the CSV and not cached; the categories of each chunk are only those in the chunk.
+    :param cache_format: CACHE_PARQUET, CACHE_FEATHER or None for no cache.  Caching is skipped if pandas has no
+        engine (pyarrow / fastparquet) for the format.
+    """
+    columns = get_columns(settings, include_target)
+    dtypes = get_dtypes(settings)
+    if chunksize is not None:
+        return _read_chunks(file_path, columns, dtypes, chunksize)
+    if cache_format is None:
+        return _read_csv(file_path, columns, dtypes)
+
+    cache_path = get_cache_path(file_path, columns, dtypes, cache_format)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            return _read_cache(cache_path, cache_format)
+        except ImportError:
+            return _read_csv(file_path, columns, dtypes)
+
+    ret = _read_csv(file_path, columns, dtypes)
+    _write_cache(ret, cache_path, cache_format)
+    return ret
+
+
+def get_columns(settings, include_target=True):
+    """
+    Returns record_pk, the string, numeric and special string features and optionally the target, without repeats
+    """
+    ret = []
+    columns = [settings.record_pk] + settings.all_features + ([settings.target] if include_target else [])
+    for column in columns:
+        if column not in ret:
+            ret.append(column)
+    return ret
+
+
+def get_dtypes(settings):
+    """
+    Returns the read_csv dtypes:  category for string features, float32 for numeric features and str for the
+    special string features (those are usually taken apart letter by letter rather than used as categories)
+    """
+    ret = dict((column, np.float32) for column in settings.numeric_features)
+    ret.update((column, 'category') for column in settings.string_features)
+    ret.update((column, str) for column in settings.special_string_features)
+    return ret
+
+
+def get_cache_path(file_path, columns, dtypes, cache_format=CACHE_PARQUET):
+    """
+    Returns the path of the cached copy of the CSV.  The name includes a hash of the columns and dtypes, so changing
+    the features in SETTINGS.json doesn't pick up a stale copy.
+    """
+    description = json.dumps([columns, sorted((column, str(dtype)) for column, dtype in dtypes.items())])
+    digest = hashlib.sha1(description.encode('utf-8')).hexdigest()[:10]
+    return '{}.{}{}'.format(os.path.splitext(file_path)[0], digest, _CACHE_EXTENSIONS[cache_format])
+
+
+def _read_csv(file_path, columns, dtypes):
+    # usecols doesn't keep the order columns are listed in
+    return pd.read_csv(file_path, usecols=columns, dtype=dtypes)[columns]
+
+
+def _read_chunks(file_path, columns, dtypes, chunksize):
+    for chunk in pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        yield chunk[columns]
+
+
+def _read_cache(cache_path, cache_format):
+    if cache_format == CACHE_FEATHER:
+        return pd.read_feather(cache_path)
+    return pd.read_parquet(cache_path)
+
+
+def _write_cache(data, cache_path, cache_format):
+    """
+    Writes the cached copy.  It is written to a temporary name and renamed, so a half written copy is never read.
+    Does nothing if pandas has no engine for the format.
+    """
+    temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+        if cache_format == CACHE_FEATHER:
+            data.to_feather(temp_path)
+        else:
+            data.to_parquet(temp_path, index=False)
+    except ImportError:
+        return
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    os.rename(temp_path, cache_path)
@@ -1,21 +1,137 @@
+"""
+settings.py:  the competition settings in SETTINGS.json.
+
+Use get_settings() rather than Settings() where it's called often:  the file is parsed once per process and
+parsed again only when its modification time changes.
+"""
 import os, json
+import threading
+
+SETTINGS_FILE_NAME = 'SETTINGS.json'
+SETTINGS_PATH_VARIABLE = 'KAGGLE_SETTINGS_PATH' # environment variable with the path of SETTINGS.json
+
+_settings_cache = {}
+_settings_cache_lock = threading.Lock()
+
+
+def find_settings_file(settings_path=None):
+    """
+    Returns the location of SETTINGS.json:  settings_path if passed, else the KAGGLE_SETTINGS_PATH environment variable,
+    else SETTINGS.json in the parent directory
+    """
+    return settings_path or os.environ.get(SETTINGS_PATH_VARIABLE) or os.path.join(os.pardir, SETTINGS_FILE_NAME)
+
+
+def get_settings(settings_path=None):
+    """
+    Returns the process wide Settings for the file (see find_settings_file), re-reading it if it has changed
+    """
+    settings_path = find_settings_file(settings_path)
+    key = os.path.abspath(settings_path)
+    mtime = os.path.getmtime(settings_path)
+    with _settings_cache_lock:
+        cached = _settings_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
 
-class Settings():
-    def __init__(self):
-        with open(os.path.join(os.pardir, 'SETTINGS.json')) as f:
+    ret = Settings(settings_path)
+    with _settings_cache_lock:
+        _settings_cache[key] = (mtime, ret)
+    return ret
+
+
+class _lazy_property(object):
+    """
+    Computes the attribute on first access and stores it on the instance
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        ret = self.func(instance)
+        instance.__dict__[self.func.__name__] = ret
+        return ret
+
+
+class Settings(object):
+    """
+    The values in SETTINGS.json.  Data paths are relative to the directory SETTINGS.json is in; the saved object and
+    submission directories are relative to the current directory.  Paths are worked out the first time they are used.
+    Pickling only sends the file's location and parsed contents, so instances are cheap to pass to worker processes.
+    """
+    def __init__(self, settings_path=None):
+        """
+        :param settings_path: location of SETTINGS.json (see find_settings_file).  Stored as an absolute path, so the
+            data paths don't change if the current directory does (or in a worker started elsewhere)
+        """
+        self.settings_path = os.path.abspath(find_settings_file(settings_path))
+        with open(self.settings_path) as f:
             self.raw_json = json.load(f)
 
-        self.competiton_name = self.raw_json['competition_name']
-        self.train_file_path = os.path.join(os.path.pardir, self.raw_json['data_directory_name'], self.raw_json['train_file'] )
-        self.test_file_path = os.path.join(os.path.pardir, self.raw_json['data_directory_name'], self.raw_json['test_file'])
-        self.saved_object_directory = os.path.join(os.path.curdir, self.raw_json['saved_object_directory_name'])
-        self.submissions_directory =  os.path.join(os.path.curdir, self.raw_json['submission_directory_name'])
-        self.non_features = self.raw_json['data_info']['non_features']
-        self.string_features = self.raw_json['data_info']['string_features']
-        self.special_string_features = self.raw_json['data_info']['special_string_features']
-        self.numeric_features = self.raw_json['data_info']['numeric_features']
-        self.logging_config = os.path.join(os.path.pardir, self.raw_json['logging_config_file'] )
-        self.all_features = self.string_features+self.numeric_features+self.special_string_features
-        self.target = self.raw_json['data_info']['target']
-        self.record_pk = self.raw_json['data_info']['record_pk']
+    def __getstate__(self):
+        return {'settings_path': self.settings_path, 'raw_json': self.raw_json}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    @_lazy_property
+    def base_directory(self):
+        """
+        The directory SETTINGS.json is in
+        """
+        return os.path.dirname(self.settings_path)
+
+    @_lazy_property
+    def competiton_name(self):
+        return self.raw_json['competition_name']
+
+    @_lazy_property
+    def train_file_path(self):
+        return os.path.join(self.base_directory, self.raw_json['data_directory_name'], self.raw_json['train_file'])
+
+    @_lazy_property
+    def test_file_path(self):
+        return os.path.join(self.base_directory, self.raw_json['data_directory_name'], self.raw_json['test_file'])
+
+    @_lazy_property
+    def saved_object_directory(self):
+        return os.path.join(os.path.curdir, self.raw_json['saved_object_directory_name'])
+
+    @_lazy_property
+    def submissions_directory(self):
+        return os.path.join(os.path.curdir, self.raw_json['submission_directory_name'])
+
+    @_lazy_property
+    def non_features(self):
+        return self.raw_json['data_info']['non_features']
+
+    @_lazy_property
+    def string_features(self):
+        return self.raw_json['data_info']['string_features']
+
+    @_lazy_property
+    def special_string_features(self):
+        return self.raw_json['data_info']['special_string_features']
+
+    @_lazy_property
+    def numeric_features(self):
+        return self.raw_json['data_info']['numeric_features']
+
+    @_lazy_property
+    def logging_config(self):
+        return os.path.join(self.base_directory, self.raw_json['logging_config_file'])
+
+    @_lazy_property
+    def all_features(self):
+        return self.string_features+self.numeric_features+self.special_string_features
+
+    @_lazy_property
+    def target(self):
+        return self.raw_json['data_info']['target']
 
+    @_lazy_property
+    def record_pk(self):
+        return self.raw_json['data_info']['record_pk']
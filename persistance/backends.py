@@ -0,0 +1,682 @@
+"""
+backends.py:  the databases PersistModel can record runs in.
+
+StorageBackend holds the SQL for every run, note, score, object info and grid result operation.
+MySQLBackend and SQLiteBackend provide the connection and the parameter placeholder style.
+"""
+import os
+import sqlite3
+import threading
+import weakref
+
+try:
+    import MySQLdb
+except ImportError:
+    MySQLdb = None  # Only needed for MySQLBackend
+
+from persistance.database import login_info
+
+_MAX_ALLOWED_PACKET_SIZE = 500 * 1024 * 1024 #500MB
+_DEFAULT_BATCH_SIZE = 1000 # rows per executemany
+_DEFAULT_POOL_SIZE = 8 # idle connections kept per server
+_IN_CLAUSE_SIZE = 500 # run ids per IN (...) when loading many runs
+_SCHEMA_LOCK_NAME = 'dmb_schema_upgrade' # MySQL named lock held while upgrading the schema
+_SCHEMA_LOCK_TIMEOUT = 60 # seconds to wait for another process's upgrade
+
+
+class StorageBackend(object):
+    """
+    Base class for the database behind PersistModel.
+    The SQL is written with %s placeholders; subclasses with a different paramstyle override _prepare.
+    """
+    # (table, CREATE TABLE IF NOT EXISTS statement) for tables added after the first ones.  See upgrade_schema
+    _ADDED_TABLES = []
+    # (table, column, column definition) for columns added after the tables were first created.  See upgrade_schema
+    _ADDED_COLUMNS = [
+        ('model_run_object_info', 'label', 'VARCHAR(255) NULL'),
+        ('grid_search_results', 'params_json', 'TEXT NULL'),
+        ('grid_search_results', 'cv_scores', 'TEXT NULL'),
+    ]
+
+    def __init__(self, connection, batch_size=_DEFAULT_BATCH_SIZE):
+        """
+        :param connection: open DB-API connection
+        :param batch_size: maximum number of rows sent per executemany
+        """
+        self._db = connection
+        self.batch_size = batch_size
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+    def create_run(self, project_name, run_time_stamp):
+        """
+        Adds a record to model_runs and returns the new run_id
+        """
+        sql = " INSERT INTO model_runs " \
+              " (project_name, run_time_stamp) " \
+              " VALUES (%s, %s)"
+        cursor = self._db.cursor()
+        try:
+            cursor.execute(self._prepare(sql), [project_name, run_time_stamp])
+            run_id = cursor.lastrowid
+        finally:
+            cursor.close()
+        self.commit()
+        return run_id
+
+    def get_run(self, run_id):
+        """
+        Returns the (project_name, run_time_stamp) rows for the run
+        """
+        sql = ' SELECT project_name, run_time_stamp ' \
+              ' FROM model_runs ' \
+              ' WHERE run_id = %s'
+        return self._query(sql, [run_id])
+
+    def get_notes(self, run_id):
+        """
+        Returns the (note_time_stamp, sequence_num, note) rows for the run
+        """
+        sql = ' SELECT note_time_stamp, sequence_num, note ' \
+              ' FROM model_run_notes ' \
+              ' WHERE run_id = %s ' \
+              ' ORDER BY sequence_num'
+        return self._query(sql, [run_id])
+
+    def get_scores(self, run_id):
+        """
+        Returns the (score_type, score) rows for the run
+        """
+        sql = ' SELECT score_type, score' \
+              ' FROM model_scores ' \
+              ' WHERE run_id = %s '
+        return self._query(sql, [run_id])
+
+    def get_object_info(self, run_id):
+        """
+        Returns the (sequence_num, obj_type, object_info, file_name, label) rows for the run
+        """
+        sql = ' SELECT sequence_num, obj_type, object_info, file_name, label ' \
+              ' FROM model_run_object_info ' \
+              ' WHERE run_id = %s ' \
+              ' ORDER BY sequence_num'
+        return self._query(sql, [run_id])
+
+    def get_runs(self, run_ids=None, run_id_range=None, project_name=None):
+        """
+        Returns the (run_id, project_name, run_time_stamp) rows for the runs matching all of the filters passed
+        :param run_ids: list of run ids
+        :param run_id_range: (first, last) run ids, inclusive
+        :param project_name: only runs of this project
+        """
+        sql = ' SELECT run_id, project_name, run_time_stamp ' \
+              ' FROM model_runs ' \
+              ' WHERE {} ' \
+              ' ORDER BY run_id'
+        return self._query_runs(sql, run_ids, run_id_range, project_name)
+
+    def get_scores_for_runs(self, run_ids=None, run_id_range=None, project_name=None):
+        """
+        Returns the (run_id, score_type, score) rows for the runs matching the filters (see get_runs)
+        """
+        sql = ' SELECT run_id, score_type, score ' \
+              ' FROM model_scores ' \
+              ' WHERE {} ' \
+              ' ORDER BY run_id'
+        return self._query_runs(sql, run_ids, run_id_range, project_name)
+
+    def get_grid_scores_for_runs(self, run_ids=None, run_id_range=None, project_name=None):
+        """
+        Returns the (run_id, mean, std, params, params_json, cv_scores) rows for the runs matching the filters (see get_runs)
+        """
+        sql = ' SELECT run_id, mean, std, params, params_json, cv_scores ' \
+              ' FROM grid_search_results ' \
+              ' WHERE {} ' \
+              ' ORDER BY run_id'
+        return self._query_runs(sql, run_ids, run_id_range, project_name)
+
+    def _query_runs(self, sql, run_ids=None, run_id_range=None, project_name=None):
+        """
+        Runs sql, which has a {} placeholder for the WHERE conditions, for the runs matching the filters.
+        A list of run ids is sent _IN_CLAUSE_SIZE ids per query, so the number of queries doesn't grow with each run.
+        """
+        conditions = []
+        params = []
+        if run_id_range is not None:
+            conditions.append('run_id BETWEEN %s AND %s')
+            params.extend(run_id_range)
+        if project_name is not None:
+            conditions.append('run_id IN (SELECT run_id FROM model_runs WHERE project_name = %s)')
+            params.append(project_name)
+        if run_ids is None:
+            if not conditions:
+                raise ValueError('Pass run_ids, run_id_range or project_name')
+            return self._query(sql.format(' AND '.join(conditions)), params)
+
+        run_ids = list(run_ids)
+        ret = []
+        for start in range(0, len(run_ids), _IN_CLAUSE_SIZE):
+            chunk = run_ids[start:start + _IN_CLAUSE_SIZE]
+            in_clause = 'run_id IN ({})'.format(', '.join(['%s'] * len(chunk)))
+            ret.extend(self._query(sql.format(' AND '.join(conditions + [in_clause])), params + chunk))
+        return ret
+
+    def get_grid_scores(self, run_id):
+        """
+        Returns the (mean, std, params, params_json, cv_scores) rows for the run
+        """
+        sql = ' SELECT mean, std, params, params_json, cv_scores ' \
+              ' FROM grid_search_results ' \
+              ' WHERE run_id = %s '
+        return self._query(sql, [run_id])
+
+    def find_runs(self, transformer_class=None, parameter=None, value=None, value_contains=None, path=None,
+                  project_name=None):
+        """
+        Returns the ids of the runs with a transformer_index row matching all of the conditions passed
+        :param transformer_class: module qualified class name
+        :param parameter: var name
+        :param value: encoded value the var equals (see transformers.index_value)
+        :param value_contains: text the encoded value contains
+        :param path: path of the node in the tree
+        :param project_name: only runs of this project
+        """
+        conditions = []
+        params = []
+        for column, column_value in [('transformer_class', transformer_class), ('parameter', parameter),
+                                     ('value', value), ('path', path)]:
+            if column_value is not None:
+                conditions.append('{} = %s'.format(column))
+                params.append(column_value)
+        if value_contains is not None:
+            conditions.append('value LIKE %s')
+            params.append('%' + value_contains.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_') + '%')
+        if project_name is not None:
+            conditions.append('run_id IN (SELECT run_id FROM model_runs WHERE project_name = %s)')
+            params.append(project_name)
+        if not conditions:
+            raise ValueError('Pass at least one condition')
+
+        sql = ' SELECT DISTINCT run_id ' \
+              ' FROM transformer_index ' \
+              ' WHERE {} ' \
+              ' ORDER BY run_id'.format(' AND '.join(conditions))
+        return [row[0] for row in self._query(sql, params)]
+
+    def get_file_reference_counts(self):
+        """
+        Returns a dict of file_name to the number of model_run_object_info rows (across all runs) referring to it
+        """
+        sql = ' SELECT file_name, COUNT(*) ' \
+              ' FROM model_run_object_info ' \
+              ' GROUP BY file_name'
+        return dict(self._query(sql))
+
+    def delete_run(self, run_id):
+        """
+        Deletes the run and everything recorded for it, in one transaction.
+        The object files are left for garbage collection.
+        """
+        cursor = self._db.cursor()
+        try:
+            for table in ['model_run_notes', 'model_scores', 'model_run_object_info', 'grid_search_results',
+                          'transformer_index', 'model_runs']:
+                cursor.execute(self._prepare('DELETE FROM {} WHERE run_id = %s'.format(table)), [run_id])
+        except Exception:
+            self.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.commit()
+
+    def insert_object_info(self, rows, commit=True):
+        """
+        :param rows: [run_id, sequence_num, obj_type, object_info, file_name, label] lists
+        """
+        sql = " INSERT INTO model_run_object_info " \
+              " ( run_id, sequence_num, obj_type, object_info, file_name, label ) " \
+              " VALUES (%s, %s, %s, %s, %s, %s)"
+        self._insert_rows(sql, rows, commit)
+
+    def insert_notes(self, rows, commit=True):
+        """
+        :param rows: [run_id, sequence_num, note_time_stamp, note] lists
+        """
+        sql = " INSERT INTO model_run_notes " \
+              " (run_id, sequence_num, note_time_stamp, note ) " \
+              " VALUES (%s, %s, %s, %s)"
+        self._insert_rows(sql, rows, commit)
+
+    def insert_scores(self, rows, commit=True):
+        """
+        :param rows: [run_id, score_type, score] lists
+        """
+        sql = " INSERT INTO model_scores " \
+              " (run_id, score_type, score ) " \
+              " VALUES (%s, %s, %s)"
+        self._insert_rows(sql, rows, commit)
+
+    def insert_grid_scores(self, rows, commit=True):
+        """
+        :param rows: [run_id, mean, std, params, params_json, cv_scores] lists
+        """
+        sql = " INSERT INTO grid_search_results " \
+              " (run_id, mean, std, params, params_json, cv_scores) " \
+              " VALUES (%s, %s, %s, %s, %s, %s) "
+        self._insert_rows(sql, rows, commit)
+
+    def upgrade_schema(self):
+        """
+        Adds any of the _ADDED_TABLES and _ADDED_COLUMNS missing from an existing database.
+        When nothing is missing nothing is run, so an up to date database needs no CREATE or ALTER privileges.
+        """
+        if not self._missing_schema():
+            return
+        self._lock_schema()
+        try:
+            # Checked again, another process may have upgraded the database while this one waited for the lock
+            for statement in self._missing_schema():
+                cursor = self._db.cursor()
+                try:
+                    cursor.execute(statement)
+                finally:
+                    cursor.close()
+            self.commit()
+        finally:
+            self._unlock_schema()
+
+    def _missing_schema(self):
+        """
+        Returns the statements adding the _ADDED_TABLES and _ADDED_COLUMNS the database doesn't have
+        """
+        table_names = self._table_names()
+        ret = [statement for table, statement in self._ADDED_TABLES if table not in table_names]
+        for table, column, definition in self._ADDED_COLUMNS:
+            if column not in self._column_names(table):
+                ret.append('ALTER TABLE {} ADD COLUMN {} {}'.format(table, column, definition))
+        return ret
+
+    def database_name(self):
+        """
+        Returns a name identifying the database, e.g. to record which databases use an object store
+        """
+        raise NotImplementedError()
+
+    def _table_names(self):
+        raise NotImplementedError()
+
+    def _column_names(self, table):
+        raise NotImplementedError()
+
+    def _lock_schema(self):
+        """
+        Keeps other processes from upgrading the schema at the same time (see upgrade_schema)
+        """
+        pass
+
+    def _unlock_schema(self):
+        pass
+
+    def insert_transformer_index(self, rows, commit=True):
+        """
+        :param rows: [run_id, sequence_num, path, transformer_class, parameter, value] lists
+        """
+        sql = " INSERT INTO transformer_index " \
+              " (run_id, sequence_num, path, transformer_class, parameter, value) " \
+              " VALUES (%s, %s, %s, %s, %s, %s) "
+        self._insert_rows(sql, rows, commit)
+
+    def _prepare(self, sql):
+        """
+        Converts the %s placeholders to the paramstyle of the connection
+        """
+        return sql
+
+    def _query(self, sql, params=()):
+        cursor = self._db.cursor()
+        try:
+            cursor.execute(self._prepare(sql), params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _insert_rows(self, sql, rows, commit=True):
+        """
+        Inserts the rows with executemany, batch_size rows at a time.
+        When commit is False the caller is responsible for committing (or rolling back) the transaction.
+        """
+        sql = self._prepare(sql)
+        cursor = self._db.cursor()
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[start:start + self.batch_size])
+        except Exception:
+            if commit:
+                self.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        if commit:
+            self.commit()
+
+
+class MySQLBackend(StorageBackend):
+    """
+    Records runs in MySQL (the analysis_results database in database.login_info by default)
+    Unless a connection is passed, the connection is borrowed from the process wide ConnectionPool for the
+    server and handed back on close (or when the backend is garbage collected).
+    The tables are managed outside of this library.  The first time each process connects to a database, the newer
+    tables and columns are added if it doesn't have them (see upgrade_schema); only that needs CREATE and ALTER privileges.
+    """
+    _ADDED_TABLES = [
+        ('transformer_index',
+         ' CREATE TABLE IF NOT EXISTS transformer_index ('
+        '   run_id INT NOT NULL,'
+        '   sequence_num INT NOT NULL,'
+        '   path VARCHAR(1024) NOT NULL,'
+        '   transformer_class VARCHAR(255) NOT NULL,'
+        '   parameter VARCHAR(255) NULL,'
+        '   value VARCHAR(1024) NULL,'
+        '   INDEX ix_transformer_index_run_id (run_id),'
+        '   INDEX ix_transformer_index_class (transformer_class(100), parameter(100), value(100)),'
+        '   INDEX ix_transformer_index_parameter (parameter(100), value(100)))'
+        ' CHARACTER SET utf8'),
+    ]
+
+    def __init__(self, connection=None, connection_info=None, batch_size=_DEFAULT_BATCH_SIZE):
+        """
+        :param connection: open MySQLdb connection.  If not passed, one is taken from the pool for connection_info
+        :param connection_info: MySQLdb.connect keyword arguments.  Defaults to database.login_info
+        """
+        self._pool = None
+        self._database_name = None
+        schema_key = None
+        if connection is None:
+            connection_info = connection_info or login_info
+            self._pool = get_pool(connection_info)
+            connection = self._pool.acquire()
+            schema_key = (_server_key(connection_info), connection_info.get('db'))
+        else:
+            connection.set_character_set('utf8')
+        super(MySQLBackend, self).__init__(connection, batch_size)
+        self._upgrade_schema_once(schema_key)
+
+    def _upgrade_schema_once(self, schema_key=None):
+        """
+        Runs upgrade_schema for the first connection of the process to each server and database
+        :param schema_key: ((host, port), db).  Looked up from the connection if not passed
+        """
+        if schema_key is None:
+            with _pools_lock:
+                if self._db in _schema_checked_connections:
+                    return
+            host, port, db = self._query('SELECT @@hostname, @@port, DATABASE()')[0]
+            schema_key = ((host, port), db)
+        with _pools_lock:
+            upgraded = schema_key in _schema_upgraded
+        if not upgraded:
+            try:
+                self.upgrade_schema()
+            except Exception as e:
+                raise Exception('Could not add the newer PersistModel tables and columns to {} ({}).  '
+                                'Run MySQLBackend.upgrade_schema() as a user with CREATE and ALTER privileges'
+                                .format(schema_key, e))
+        with _pools_lock:
+            _schema_upgraded.add(schema_key)
+            try:
+                _schema_checked_connections.add(self._db)
+            except TypeError:
+                pass # connections that can't be weakly referenced are looked up each time
+
+    def close(self):
+        """
+        Returns a pooled connection to its pool.  A connection that was passed in belongs to the caller and is left open.
+        """
+        if self._db is None:
+            return
+        if self._pool is not None:
+            self._pool.release(self._db)
+        self._db = None
+
+    def database_name(self):
+        """
+        mysql://host:port/database, as the server reports them (so every connection to a database gives the same name)
+        """
+        if self._database_name is None:
+            self._database_name = 'mysql://{}:{}/{}'.format(*self._query('SELECT @@hostname, @@port, DATABASE()')[0])
+        return self._database_name
+
+    def _table_names(self):
+        return [row[0] for row in self._query(' SELECT table_name FROM information_schema.tables '
+                                              ' WHERE table_schema = DATABASE()')]
+
+    def _column_names(self, table):
+        return [row[0] for row in self._query(' SELECT column_name FROM information_schema.columns '
+                                              ' WHERE table_schema = DATABASE() AND table_name = %s', [table])]
+
+    def _lock_schema(self):
+        if self._query('SELECT GET_LOCK(%s, %s)', [_SCHEMA_LOCK_NAME, _SCHEMA_LOCK_TIMEOUT])[0][0] != 1:
+            raise Exception('Timed out waiting for the {} lock'.format(_SCHEMA_LOCK_NAME))
+
+    def _unlock_schema(self):
+        self._query('SELECT RELEASE_LOCK(%s)', [_SCHEMA_LOCK_NAME])
+
+    def __del__(self):
+        if self._pool is not None:
+            try:
+                self.close()
+            except Exception:
+                pass
+
+
+class ConnectionPool(object):
+    """
+    Thread safe pool of MySQLdb connections to one server.
+    Up to max_size idle connections are kept for reuse; acquire never blocks, it connects when none are idle.
+    Idle connections are pinged before being handed out and replaced if they have gone away.
+    """
+    def __init__(self, connection_info, max_size=_DEFAULT_POOL_SIZE):
+        self._connection_info = connection_info
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns a healthy connection, either an idle one or a new one
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection = self._idle.pop()
+            if _is_healthy(connection):
+                return connection
+            _close_quietly(connection)
+        return _create_connection(self._connection_info)
+
+    def release(self, connection):
+        """
+        Hands a connection back.  Any open transaction is rolled back first.
+        """
+        try:
+            connection.rollback()
+        except Exception:
+            _close_quietly(connection)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(connection)
+                return
+        _close_quietly(connection)
+
+    def clear(self):
+        """
+        Closes all of the idle connections
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            _close_quietly(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_packet_size_checked = set()
+_schema_upgraded = set()
+_schema_checked_connections = weakref.WeakSet() # passed in connections whose database is in _schema_upgraded
+
+
+def get_pool(connection_info, max_size=_DEFAULT_POOL_SIZE):
+    """
+    Returns the process wide pool for the server, user and database in connection_info, creating it if needed.
+    Pools are per process so forked workers never share a socket with their parent.
+    """
+    key = (os.getpid(), _server_key(connection_info), connection_info.get('user'), connection_info.get('db'))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connection_info, max_size)
+        return _pools[key]
+
+
+def _server_key(connection_info):
+    return connection_info.get('host'), connection_info.get('port')
+
+
+def _create_connection(connection_info):
+    """
+    creates a MySQLdb.connection
+    """
+    if MySQLdb is None:
+        raise Exception('MySQLdb has to be installed to use the MySQL backend')
+
+    ret = MySQLdb.connect(**connection_info)
+    ret.set_character_set('utf8')
+    _check_max_allowed_packet(ret, _server_key(connection_info))
+    return ret
+
+
+def _check_max_allowed_packet(connection, server_key):
+    """
+    Some of the information in this get's big.  I need to check the value of max_global packet.  If it's already bigger, leave it.  If it's smaller, update
+    The setting is global, so this is only done for the first connection to each server.
+    """
+    with _pools_lock:
+        if server_key in _packet_size_checked:
+            return
+
+    sql = 'select @@global.max_allowed_packet'
+
+    cursor = connection.cursor()
+    cursor.execute(sql)
+    max_allowed_packet_value = cursor.fetchone()[0]
+    if max_allowed_packet_value < _MAX_ALLOWED_PACKET_SIZE:
+        sql = 'SET @@global.max_allowed_packet = {}'.format(_MAX_ALLOWED_PACKET_SIZE)
+        cursor.execute(sql)
+    cursor.close()
+
+    with _pools_lock:
+        _packet_size_checked.add(server_key)
+
+
+def _is_healthy(connection):
+    try:
+        connection.ping()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Records runs in a local SQLite database file (in WAL mode), creating or upgrading the tables if needed.
+    Handy for batch nodes without access to MySQL and for testing.
+    """
+    _SCHEMA = [
+        ' CREATE TABLE IF NOT EXISTS model_runs ('
+        '   run_id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '   project_name TEXT,'
+        '   run_time_stamp TIMESTAMP)',
+        ' CREATE TABLE IF NOT EXISTS model_run_notes ('
+        '   run_id INTEGER,'
+        '   sequence_num INTEGER,'
+        '   note_time_stamp TIMESTAMP,'
+        '   note TEXT)',
+        ' CREATE TABLE IF NOT EXISTS model_scores ('
+        '   score_id INTEGER PRIMARY KEY AUTOINCREMENT,'
+        '   run_id INTEGER,'
+        '   score_type TEXT,'
+        '   score REAL)',
+        ' CREATE TABLE IF NOT EXISTS model_run_object_info ('
+        '   run_id INTEGER,'
+        '   sequence_num INTEGER,'
+        '   obj_type TEXT,'
+        '   object_info TEXT,'
+        '   file_name TEXT,'
+        '   label TEXT)',
+        ' CREATE TABLE IF NOT EXISTS grid_search_results ('
+        '   run_id INTEGER,'
+        '   mean REAL,'
+        '   std REAL,'
+        '   params TEXT,'
+        '   params_json TEXT,'
+        '   cv_scores TEXT)',
+        ' CREATE TABLE IF NOT EXISTS transformer_index ('
+        '   run_id INTEGER,'
+        '   sequence_num INTEGER,'
+        '   path TEXT,'
+        '   transformer_class TEXT,'
+        '   parameter TEXT,'
+        '   value TEXT)',
+        ' CREATE INDEX IF NOT EXISTS ix_model_run_notes_run_id ON model_run_notes (run_id)',
+        ' CREATE INDEX IF NOT EXISTS ix_model_scores_run_id ON model_scores (run_id)',
+        ' CREATE INDEX IF NOT EXISTS ix_model_run_object_info_run_id ON model_run_object_info (run_id)',
+        ' CREATE INDEX IF NOT EXISTS ix_grid_search_results_run_id ON grid_search_results (run_id)',
+        ' CREATE INDEX IF NOT EXISTS ix_transformer_index_run_id ON transformer_index (run_id)',
+        ' CREATE INDEX IF NOT EXISTS ix_transformer_index_class ON transformer_index (transformer_class, parameter, value)',
+        ' CREATE INDEX IF NOT EXISTS ix_transformer_index_parameter ON transformer_index (parameter, value)',
+    ]
+
+    def __init__(self, database_path, batch_size=_DEFAULT_BATCH_SIZE):
+        """
+        :param database_path: the SQLite database file (':memory:' for a throw away database)
+        """
+        # PARSE_DECLTYPES returns the TIMESTAMP columns as datetimes, like MySQLdb does.
+        # The connection may be used from PersistModel's background save thread (one thread at a time)
+        self.database_path = database_path
+        connection = sqlite3.connect(database_path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        for statement in self._SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        super(SQLiteBackend, self).__init__(connection, batch_size)
+        self.upgrade_schema()
+
+    def database_name(self):
+        return 'sqlite://' + (self.database_path if self.database_path == ':memory:'
+                              else os.path.abspath(self.database_path))
+
+    def _table_names(self):
+        return [row[0] for row in self._query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def _column_names(self, table):
+        return [row[1] for row in self._query('PRAGMA table_info({})'.format(table))]
+
+    def _prepare(self, sql):
+        return sql.replace('%s', '?').replace("LIKE ?", "LIKE ? ESCAPE '\\'")
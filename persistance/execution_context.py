@@ -1,20 +1,26 @@
 """
 Excecution_context.py:  Used for establishing a record of run execution.
-Currently it's backed by a database. I may abstract it later for other types of back ends.
+The run context is stored through a StorageBackend (MySQL by default, or a local SQLite file).
 """
-import MySQLdb
-import cPickle
-import gzip
-from database import login_info
+from persistance.backends import MySQLBackend, _DEFAULT_BATCH_SIZE
+from persistance import serialization
+from persistance.object_cache import ObjectCache, estimate_size, _DEFAULT_MAX_BYTES
+from persistance.object_store import ObjectStore, _DEFAULT_MIN_AGE
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import ast
+import functools
+import json
 import os
 from data_preparation import transformers
 import numpy as np
+import pandas as pd
 
 _FILE_NAME_TEMPLATE = "R{run_id:06d}_{time_stamp:%Y%m%d_%H%M%S}_{type}_{obj_num:02d}"
 _RUN_TIME_STAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
 _NOTE_TIME_STAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f' # Includes microseconds
-_MAX_ALLOWED_PACKET_SIZE = 500 * 1024 * 1024 #500MB
+_MAX_INDEX_VALUE_LENGTH = 1024 # longer transformer_index values are truncated
 
 class FileObjectType():
     """
@@ -31,15 +37,28 @@ class FileObjectType():
     def __init__(self):
         pass
 
+# Arrays and DataFrames of these types are saved uncompressed and memory mapped when loaded (see serialization)
+_ARRAY_OBJECT_TYPES = [FileObjectType.train_feature, FileObjectType.train_target]
+# Objects of these types are encoded as transformer trees and indexed in transformer_index
+_TRANSFORMER_OBJECT_TYPES = [FileObjectType.predictor_model, FileObjectType.feature_model]
+
+# DataFrames returned by PersistModel.load_runs
+RunMetadata = namedtuple('RunMetadata', ['runs', 'scores', 'grid_scores'])
+
+# A grid search result loaded from the database, with the fields PersistModel uses from sklearn's grid_scores_
+GridScore = namedtuple('GridScore', ['parameters', 'mean_validation_score', 'cv_validation_scores'])
+
 class ObjectInfo():
     """
     This class holds objects and context.  Used as a staging object before saving and loading data
     """
-    def __init__(self, obj_type=None, obj=None, obj_info=None, file_name=None ):
+    def __init__(self, obj_type=None, obj=None, obj_info=None, file_name=None, sequence_num=None, label=None):
         self.obj_type = obj_type
         self.obj = obj
         self.obj_info = obj_info
         self.file_name = file_name
+        self.sequence_num = sequence_num
+        self.label = label
 
 class PersistModel:
     """
@@ -47,26 +66,40 @@ class PersistModel:
     It provides methods for initializing, storing and retrieving context to database and instantiated objects to file.
     When instantiated without a run_id, a new one is created.
     When instantiated with a run_id, the context is loaded from the database
-    Files and previously instantiated objects are loaded the first time they are requested.
+    Files and previously instantiated objects are loaded the first time they are requested, and kept in
+    an LRU cache limited to cache_max_bytes.
     """
-    def __init__(self, object_file_location, project_name, connection=None,  run_id=None, start_time=None):
+    def __init__(self, object_file_location, project_name, connection=None,  run_id=None, start_time=None,
+                 batch_size=_DEFAULT_BATCH_SIZE, backend=None, codec=serialization.CODEC_GZIP, compression_level=None,
+                 cache_max_bytes=_DEFAULT_MAX_BYTES):
         """
         Initializes class
-        :param connection: Open MySQLdb connection
+        :param connection: Open MySQLdb connection (ignored when a backend is passed)
         :param object_file_location: the directory where object files will be (have been) stored
         :param run_id:  Run ID to initialize.  If not passed a new one is created
         :param start_time: DateTime associated as the start time.  If not passed, one is started initially
+        :param batch_size: maximum number of rows sent per executemany when saving (ignored when a backend is passed)
+        :param backend: StorageBackend to record the run in.  Defaults to MySQLBackend
+        :param codec: codec objects are saved with (see serialization).  Files are loaded with whatever codec they were saved with
+        :param compression_level: compression level for the codec.  None uses the codec's default
+        :param cache_max_bytes: size budget of the cache of objects loaded from disk
         :return:
         """
-        self._db = connection or self._create_connection()
-        self._db.set_character_set('utf8')
+        self._backend = backend or MySQLBackend(connection, batch_size=batch_size)
         self.notes = []
         self._objects_to_save = []
+        self._objects_by_type = {}
+        self._object_cache = ObjectCache(cache_max_bytes)
         self._object_file_location = object_file_location
+        self._object_store = ObjectStore(object_file_location)
         self.start_time = start_time or datetime.now()
         self.scores = []
         self.project_name = project_name
         self.grid_scores = []
+        self._save_executor = None
+        self._pending_save = None
+        self.codec = codec
+        self.compression_level = compression_level
 
         if run_id:
             # load information from database
@@ -79,11 +112,142 @@ class PersistModel:
             self.run_id = self.start_model()
 
 
-    def save_all(self):
-        self.save_all_objects()
-        self.save_all_run_notes()
-        self.save_all_scores()
-        self._save_all_grid_scores()
+    @classmethod
+    def load_runs(cls, run_ids=None, run_id_range=None, project_name=None, connection=None, backend=None):
+        """
+        Loads the metadata of many runs at once, without loading any objects or creating a PersistModel per run.
+        Runs matching all of the filters passed are returned.  Each table is read with one query
+        (or one per 500 run ids when a list is passed).
+        :param run_ids: list of run ids
+        :param run_id_range: (first, last) run ids, inclusive
+        :param project_name: only runs of this project
+        :param connection: Open MySQLdb connection (ignored when a backend is passed)
+        :param backend: StorageBackend the runs are recorded in.  Defaults to MySQLBackend
+        :return RunMetadata of DataFrames:  runs (run_id, project_name, run_time_stamp),
+            scores (run_id, score_type, score) and grid_scores (see load_grid_results)
+        """
+        owned_backend = backend is None
+        backend = backend or MySQLBackend(connection)
+        try:
+            filters = {'run_ids': run_ids, 'run_id_range': run_id_range, 'project_name': project_name}
+            return RunMetadata(
+                runs=pd.DataFrame.from_records(backend.get_runs(**filters),
+                                               columns=['run_id', 'project_name', 'run_time_stamp']),
+                scores=pd.DataFrame.from_records(backend.get_scores_for_runs(**filters),
+                                                 columns=['run_id', 'score_type', 'score']),
+                grid_scores=_grid_results_frame(backend.get_grid_scores_for_runs(**filters)))
+        finally:
+            if owned_backend:
+                backend.close()
+
+    @classmethod
+    def find_runs(cls, transformer_class=None, parameter=None, value=None, value_contains=None, path=None,
+                  project_name=None, connection=None, backend=None):
+        """
+        Returns the ids of the runs that saved a predictor or feature model with a transformer matching all of the
+        conditions passed, e.g. find_runs(LetterExtractionTransformer, 'columns', value_contains='"X"')
+        :param transformer_class: the class, or its module qualified name
+        :param parameter: name of one of the transformer's vars
+        :param value: value the var equals (compared in its transformers.index_value encoding)
+        :param value_contains: text the encoded value contains, e.g. '"X"' for a list holding 'X'
+        :param path: the node's labels from the object type down, joined by /, e.g. 'predictor_model/nfu/nce'
+        :param project_name: only runs of this project
+        :param connection: Open MySQLdb connection (ignored when a backend is passed)
+        :param backend: StorageBackend the runs are recorded in.  Defaults to MySQLBackend
+        """
+        if isinstance(transformer_class, type):
+            transformer_class = transformers.class_name(transformer_class)
+        if value is not None:
+            value = transformers.index_value(value)[:_MAX_INDEX_VALUE_LENGTH]
+
+        owned_backend = backend is None
+        backend = backend or MySQLBackend(connection)
+        try:
+            return backend.find_runs(transformer_class, parameter, value, value_contains, path, project_name)
+        finally:
+            if owned_backend:
+                backend.close()
+
+    @classmethod
+    def load_grid_results(cls, run_ids=None, run_id_range=None, project_name=None, connection=None, backend=None,
+                          parquet_path=None):
+        """
+        Loads the grid search results of the runs matching the filters (see load_runs) as one DataFrame:
+        run_id, mean and std, a param_<name> column per hyperparameter and a split<n>_score column per cv fold.
+        Results without a hyperparameter or fold have NaN there.
+        :param parquet_path: if passed, the DataFrame is also written there with to_parquet (needs pyarrow or fastparquet)
+        """
+        owned_backend = backend is None
+        backend = backend or MySQLBackend(connection)
+        try:
+            ret = _grid_results_frame(backend.get_grid_scores_for_runs(run_ids, run_id_range, project_name))
+        finally:
+            if owned_backend:
+                backend.close()
+
+        if parquet_path is not None:
+            ret.to_parquet(parquet_path)
+        return ret
+
+    def close(self):
+        """
+        Waits for any background save and releases the database connection.  Pooled connections go back to their pool,
+        a connection passed in is left open for the caller to close.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._save_executor is not None:
+                self._save_executor.shutdown()
+                self._save_executor = None
+            self._backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def save_all(self, background=False):
+        """
+        Saves all objects, notes, scores and grid scores in a single transaction.
+        If anything fails, the database changes are rolled back.
+        :param background: if True, the save runs on a background thread and a Future is returned straight away.
+            The objects are snapshotted before returning (pickled to memory, or copied for the 'array' format), so they
+            can be changed, e.g. refit on the next fold, while only compression, file writing and the database work run
+            in the background.  Call flush() (or future.result()) to wait for it and raise any error.
+            Don't start another PersistModel operation that uses the database until it is done.
+        """
+        self.flush()
+        snapshot = (self._prepare_objects(list(self._objects_to_save), snapshot=background),
+                    list(self.notes), list(self.scores), list(self.grid_scores))
+        if not background:
+            self._save_all_in_transaction(*snapshot)
+            return None
+
+        if self._save_executor is None:
+            self._save_executor = ThreadPoolExecutor(max_workers=1)
+        self._pending_save = self._save_executor.submit(self._save_all_in_transaction, *snapshot)
+        return self._pending_save
+
+    def flush(self):
+        """
+        Waits for a background save_all to finish, re-raising its exception if it failed
+        """
+        pending_save, self._pending_save = self._pending_save, None
+        if pending_save is not None:
+            pending_save.result()
+
+    def _save_all_in_transaction(self, objects, notes, scores, grid_scores):
+        try:
+            self._write_objects(objects, commit=False)
+            self.save_all_run_notes(commit=False, notes=notes)
+            self.save_all_scores(commit=False, scores=scores)
+            self._save_all_grid_scores(commit=False, grid_scores=grid_scores)
+            self._backend.commit()
+        except Exception:
+            self._backend.rollback()
+            raise
 
     def add_note(self, note, time_stamp=datetime.now()):
         """
@@ -98,53 +262,81 @@ class PersistModel:
         self.grid_scores = grid_scores
 
     # todo:  consider what needs to happen on a 'resave'.  Version or replace?  Maybe only save 'new'
-    def add_object_to_save(self, the_object, obj_type):
+    def add_object_to_save(self, the_object, obj_type, label=None):
         """
         Accepts a new item and adds it to the list. Objects aren't saved until save is called.
+        :param label: optional name, saved with the object, to tell apart several objects of the same type
+        :return the object's sequence_num
         """
+        sequence_num = len(self._objects_to_save)
+        self._add_object_info(ObjectInfo(obj_type=obj_type, obj=the_object, obj_info=str(the_object),
+                                         sequence_num=sequence_num, label=label))
+        return sequence_num
 
-        self._objects_to_save.append(ObjectInfo(obj_type=obj_type, obj=the_object, obj_info=str(the_object)))
+    def _add_object_info(self, obj_info):
+        self._objects_to_save.append(obj_info)
+        self._objects_by_type.setdefault(obj_info.obj_type, []).append(obj_info)
 
-
-    # todo:  I need a better way to load objects.  Expecially if there are multiples of the same type.
-    def get_object(self, object_type):
+    def get_object(self, object_type, sequence_num=None, label=None):
         """
         Returns a instance of an object in the list
         if the object hasn't been loaded, it will be
         loaded from disk
+        :param sequence_num: picks the object by sequence number when there are several of the type
+        :param label: picks the object by label when there are several of the type
         """
-        ret = filter(lambda x: x.obj_type == object_type, self._objects_to_save)
+        ret = self._find_object_infos(object_type, sequence_num, label)
         if len(ret) == 0:
             raise Exception('No objects of type {} found'.format(object_type))
 
         if len(ret) > 1:
-            raise Exception('Multiple types of object {} found'.format(object_type))
+            raise Exception('Multiple types of object {} found, pass a sequence_num or label'.format(object_type))
 
-        if ret[0].obj is None:
-            ret[0].obj = self._load_zipped_pickle(self._get_file_path(ret[0].file_name))
+        return self._get_loaded_object(ret[0])
 
-        return ret[0].obj
+    def get_objects(self, object_type, label=None):
+        """
+        Iterates over the objects of a type in sequence order, loading each one only when it is reached.
+        Loaded objects go through the cache, so earlier ones are dropped once the cache is full.
+        """
+        for obj_info in self._find_object_infos(object_type, label=label):
+            yield self._get_loaded_object(obj_info)
 
-    def _load_from_database(self):
+    def _find_object_infos(self, object_type, sequence_num=None, label=None):
+        ret = self._objects_by_type.get(object_type, [])
+        if sequence_num is not None:
+            ret = [obj_info for obj_info in ret if obj_info.sequence_num == sequence_num]
+        if label is not None:
+            ret = [obj_info for obj_info in ret if obj_info.label == label]
+        return ret
+
+    def _get_loaded_object(self, obj_info):
         """
-        Get's data from database.
+        Returns the object held by obj_info, or loads it from disk through the cache
         """
+        if obj_info.obj is not None:
+            return obj_info.obj
 
-        sql = ' SELECT project_name, run_time_stamp ' \
-              ' FROM model_runs ' \
-              ' WHERE run_id = {}'.format(self.run_id)
+        ret = self._object_cache.get(obj_info.file_name)
+        if ret is None:
+            file_path = self._get_file_path(obj_info.file_name)
+            ret = serialization.load_object(file_path)
+            self._object_cache.put(obj_info.file_name, ret, estimate_size(ret, file_path))
+        return ret
 
-        cursor = self._db.cursor()
-        cursor.execute(sql)
-        model_info = cursor.fetchall()
-        cursor.close()
+    def _load_from_database(self):
+        """
+        Get's data from database.
+        """
+        model_info = self._backend.get_run(self.run_id)
         #Expect only one record but might not get any
-        if len(model_info) <> 1:
+        if len(model_info) != 1:
             raise Exception('Run_id {} not found or found too many times'.format(self.run_id))
         self.project_name, self.start_time = model_info[0]
         self._load_notes_from_database()
         self._load_object_info_from_database()
         self._load_scores_from_database()
+        self._load_grid_scores_from_database()
 
 
     def _load_all_objects(self):
@@ -153,77 +345,44 @@ class PersistModel:
         The assumption is that the instance was loaded by run_id (rather than from scratch)
         """
         for obj_info in self._objects_to_save:
-            obj_info.obj = self._load_zipped_pickle(self._get_file_path(obj_info.file_name))
+            obj_info.obj = serialization.load_object(self._get_file_path(obj_info.file_name))
 
     def _load_notes_from_database(self):
         """
         Get's the notes data from database.
         """
-
-        sql = ' SELECT note_time_stamp, sequence_num, note ' \
-              ' FROM model_run_notes ' \
-              ' WHERE run_id = {} ' \
-              ' ORDER BY sequence_num'.format(self.run_id)
-
-        cursor = self._db.cursor()
-        cursor.execute(sql)
-        note_info = cursor.fetchall()
-        cursor.close()
-        # Expect only one record but might not get any
-        for (note_time_stamp, sequence_num, note) in note_info:
+        for (note_time_stamp, sequence_num, note) in self._backend.get_notes(self.run_id):
             self.add_note(note, note_time_stamp)
 
     def _load_scores_from_database(self):
         """
         Get's the score data from database.
         """
-
-        sql = ' SELECT score_type, score' \
-              ' FROM model_scores ' \
-              ' WHERE run_id = {} '.format(self.run_id)
-
-        cursor = self._db.cursor()
-        cursor.execute(sql)
-        score_info = cursor.fetchall()
-        cursor.close()
-        # Expect only one record but might not get any
-        for (score_type, score) in score_info:
+        for (score_type, score) in self._backend.get_scores(self.run_id):
             self.add_score(score_type=score_type, score=score)
 
-    def _load_object_info_from_database(self):
+    def _load_grid_scores_from_database(self):
         """
-        Get's the notes data from database.
+        Get's the grid scores from database, as GridScore tuples
         """
+        self.grid_scores = [GridScore(parameters=_parse_grid_params(params, params_json), mean_validation_score=mean,
+                                      cv_validation_scores=np.array(json.loads(cv_scores) if cv_scores else []))
+                            for (mean, std, params, params_json, cv_scores) in self._backend.get_grid_scores(self.run_id)]
 
-        sql = ' SELECT sequence_num, obj_type, object_info, file_name ' \
-              ' FROM model_run_object_info ' \
-              ' WHERE run_id = {} ' \
-              ' ORDER BY sequence_num'.format(self.run_id)
-
-        cursor = self._db.cursor()
-        cursor.execute(sql)
-        object_info = cursor.fetchall()
-        cursor.close()
-        # Expect only one record but might not get any
-        for (sequence_num, obj_type, object_info, file_name) in object_info:
-            self._objects_to_save.append(ObjectInfo(obj_type=obj_type, obj_info=object_info, file_name=file_name))
+    def _load_object_info_from_database(self):
+        """
+        Get's the object info data from database.
+        """
+        for (sequence_num, obj_type, object_info, file_name, label) in self._backend.get_object_info(self.run_id):
+            self._add_object_info(ObjectInfo(obj_type=obj_type, obj_info=object_info, file_name=file_name,
+                                             sequence_num=sequence_num, label=label))
 
     def start_model(self):
         """
         Adds a record to the database and returns the run id
         :return row_id: the row_id of the new model run
         """
-
-        sql = " INSERT INTO model_runs " \
-              " (project_name, run_time_stamp) " \
-              " VALUES (%s, %s)"
-        cursor = self._db.cursor()
-
-        cursor.execute(sql, [self.project_name, self.run_time_stamp() ])
-        row_id = cursor.lastrowid
-        cursor.close()
-        self._db.commit()
-        return row_id
+        return self._backend.create_run(self.project_name, self.run_time_stamp())
 
 
     def save_submission(self, data, location):
@@ -252,115 +411,129 @@ class PersistModel:
         return " run {}, timestamp {}".format(self.run_id, self.run_time_stamp())
 
 
-    def save_all_objects(self):
+    def save_all_objects(self, commit=True, objects=None):
         """
         Saves all of the objects in the object collection.  Saves context to database and files
-        to the folder location specified at instantiation.
-        """
-        for sequence_num, obj_info  in enumerate(self._objects_to_save):
-            obj_info.file_name = self._get_file_path(self._get_file_name(obj_info.obj_type, sequence_num))
-            self._save_object(sequence_num, obj_info.obj_type, obj_info.obj,obj_info.file_name)
+        to the content addressed store in the folder location specified at instantiation (see object_store).
+        Objects identical to ones already stored, by this or any other run, aren't written again.
+        Predictor and feature models are also flattened into transformer_index (see find_runs).
+        :param objects: the ObjectInfo list to save.  Defaults to the object collection
+        """
+        self._write_objects(self._prepare_objects(self._objects_to_save if objects is None else objects), commit)
+
+    def _prepare_objects(self, objects, snapshot=False):
+        """
+        Works out everything that depends on the objects' current state:  (sequence_num, obj_info, store,
+        object_info, index_rows) for each, where store() writes the object and returns its file name.
+        With snapshot, the objects are captured now (see ObjectStore.snapshot) rather than read when store() is called.
+        """
+        ret = []
+        if objects:
+            self._object_store.add_owner(self._backend.database_name())
+        for sequence_num, obj_info in enumerate(objects):
+            codec = self._get_codec(obj_info.obj_type, obj_info.obj)
+            if snapshot:
+                store = self._object_store.snapshot(obj_info.obj, codec, self.compression_level).write
+            else:
+                store = functools.partial(self._object_store.put, obj_info.obj, codec, self.compression_level)
+
+            index_rows = []
+            if obj_info.obj_type in _TRANSFORMER_OBJECT_TYPES:
+                transformer_tree = transformers.create_transformer_tree(obj_info.obj_type, obj_info.obj)
+                object_info = transformers.encode_transformer_tree(transformer_tree)
+                index_rows = [[self.run_id, sequence_num, path, transformer_class, parameter,
+                               value if value is None else value[:_MAX_INDEX_VALUE_LENGTH]]
+                              for path, transformer_class, parameter, value
+                              in transformers.flatten_transformer_tree(transformer_tree)]
+            else:
+                object_info = str(type(obj_info.obj))
+            ret.append((sequence_num, obj_info, store, object_info, index_rows))
+        return ret
 
-    def _save_object(self, sequence_num, obj_type, obj, file_name):
+    def _write_objects(self, prepared_objects, commit=True):
         """
-        Saves the object file and records context to the database
+        Stores the objects from _prepare_objects and inserts their object info and transformer_index rows
         """
-        file_name = self._get_file_name(obj_type, sequence_num)
-        self._save_zipped_pickle(obj, self._get_file_path(file_name))
-        self._save_object_context(sequence_num, obj_type, obj, file_name)
-
-    def _get_string_representation_object_info(self, obj_type, obj):
-        if obj_type in [FileObjectType.predictor_model, FileObjectType.feature_model]:
-            ret = transformers.encode_transformer(obj_type, obj)
-        else:
-            ret = str(type(obj))
+        rows = []
+        index_rows = []
+        for sequence_num, obj_info, store, object_info, object_index_rows in prepared_objects:
+            file_name = store()
+            obj_info.file_name = file_name
+            rows.append([self.run_id, sequence_num, obj_info.obj_type, object_info, file_name, obj_info.label])
+            index_rows.extend(object_index_rows)
+        self._backend.insert_object_info(rows, commit)
+        self._backend.insert_transformer_index(index_rows, commit)
 
-        return ret
-
-    def _save_object_context(self, sequence_num, obj_type, obj, file_name):
+    def delete_run(self):
         """
-        Adds a record to the database and returns the model_run_object_id
+        Deletes this run from the database.  Its object files are deleted by collect_garbage once no other run uses them.
         """
-        sql = " INSERT INTO model_run_object_info " \
-              " ( run_id, sequence_num, obj_type, object_info, file_name ) " \
-              " VALUES (%s, %s, %s, %s, %s)"
-
-        cursor = self._db.cursor()
-        cursor.execute(sql, [self.run_id, sequence_num, obj_type, self._get_string_representation_object_info(obj_type, obj), file_name])
-        model_run_object_id = cursor.lastrowid
-        cursor.close()
-        self._db.commit()
-        return model_run_object_id
+        self.flush()
+        self._backend.delete_run(self.run_id)
 
-    def save_all_scores(self):
+    def collect_garbage(self, min_age=_DEFAULT_MIN_AGE):
         """
-        Saves all of the notes in the collection to database.
+        Deletes the stored object files no run refers to any more.
+        Raises if runs in another database have saved objects to the same object file location (see ObjectStore.add_owner)
+        :param min_age: files modified less than min_age seconds ago are kept (they may belong to a save in progress)
+        :return the deleted files, relative to the object file location
         """
-        for score_type, score in self.scores:
-            self._save_score(score_type, score)
+        self.flush()
+        return self._object_store.collect_garbage(self._backend.get_file_reference_counts(), min_age,
+                                                  self._backend.database_name())
 
-    def save_all_run_notes(self):
+    def _get_codec(self, obj_type, obj):
         """
-        Saves all of the notes in the collection to database.
+        Train features and targets that are arrays or DataFrames are stored in the memory mappable array format,
+        everything else is pickled with self.codec
         """
-        for idx, (timestamp, note) in enumerate(self.notes):
-            self._save_run_note(idx, timestamp, note)
+        if obj_type in _ARRAY_OBJECT_TYPES and serialization.supports_array_format(obj):
+            return serialization.CODEC_ARRAY
+        return self.codec
 
-
-    def _save_score(self, score_type, score):
+    def save_all_scores(self, commit=True, scores=None):
         """
-        Adds a record to the database and returns the score_id
+        Saves all of the scores in the collection to database.
+        :param scores: the (score_type, score) list to save.  Defaults to the score collection
         """
-        sql = " INSERT INTO model_scores " \
-              " (run_id, score_type, score ) " \
-              " VALUES (%s, %s, %s)"
-        cursor = self._db.cursor()
-        cursor.execute(sql, [self.run_id, score_type, round(score,8)])
-        score_id = cursor.lastrowid
-        cursor.close()
-        self._db.commit()
-        return score_id
+        rows = [[self.run_id, score_type, round(score, 8)] for score_type, score in (self.scores if scores is None else scores)]
+        self._backend.insert_scores(rows, commit)
 
-    def _save_run_note(self, sequence_num, timestamp, note):
+    def save_all_run_notes(self, commit=True, notes=None):
         """
-        Adds a record to the database and returns the model_run_object_id
+        Saves all of the notes in the collection to database.
+        :param notes: the (timestamp, note) list to save.  Defaults to the note collection
         """
-        sql = " INSERT INTO model_run_notes " \
-              " (run_id, sequence_num, note_time_stamp, note ) " \
-              " VALUES (%s, %s, %s, %s)"
-        cursor = self._db.cursor()
-        cursor.execute(sql, [self.run_id, sequence_num, datetime.strftime(timestamp,_NOTE_TIME_STAMP_FORMAT), note])
-        run_note_id = cursor.lastrowid
-        cursor.close()
-        self._db.commit()
-        return run_note_id
+        rows = [[self.run_id, sequence_num, datetime.strftime(timestamp, _NOTE_TIME_STAMP_FORMAT), note]
+                for sequence_num, (timestamp, note) in enumerate(self.notes if notes is None else notes)]
+        self._backend.insert_notes(rows, commit)
 
     def _get_file_path(self, file_name):
         """
-        Returns the path and directory for the file_name
+        Returns the path and directory for the file_name (a store path, or the file name of an object saved
+        before the content addressed store)
         """
-        return os.path.join(self._object_file_location, file_name)
+        return self._object_store.path(file_name)
 
-    def _save_grid_score(self, mean, std, params):
+    def _save_all_grid_scores(self, commit=True, grid_scores=None):
         """
-        This function saves one grid score record to the database
-        :param mean: the mean_validation_score
-        :param std:  standard deviation of cv_validation_scores
-        :param params:  the parameters that resulted in the score
+        Saves the grid scores to the database.  For each score it saves
+        the mean_validation_score, the standard deviation of the cv_validation_scores,
+        the parameters that resulted in the score (as a string and as json) and the cv_validation_scores (as json)
         """
-        sql = " INSERT INTO grid_search_results " \
-              " (run_id, mean, std, params) " \
-              " VALUES (%s, %s, %s, %s) "
-        cursor = self._db.cursor()
-        cursor.execute(sql, [self.run_id, round(mean, 8), round(std, 8), params])
-        self._db.commit()
-
-
-    def _save_all_grid_scores(self):
-        for score in self.grid_scores:
-            self._save_grid_score(score.mean_validation_score,
-                                 np.std(score.cv_validation_scores),
-                                 str(score.parameters))
+        grid_scores = self.grid_scores if grid_scores is None else grid_scores
+        rows = []
+        if len(grid_scores) > 0:
+            cv_scores = [np.asarray(score.cv_validation_scores, dtype=np.float64) for score in grid_scores]
+            if len(set(len(fold_scores) for fold_scores in cv_scores)) == 1:
+                # The results of one search have the same number of folds, so the stds are computed in one go
+                stds = np.std(np.vstack(cv_scores), axis=1)
+            else:
+                stds = [np.std(fold_scores) for fold_scores in cv_scores]
+            rows = [[self.run_id, round(score.mean_validation_score, 8), round(std, 8), str(score.parameters),
+                     json.dumps(score.parameters, sort_keys=True, default=_to_json_value), json.dumps(fold_scores.tolist())]
+                    for score, std, fold_scores in zip(grid_scores, stds, cv_scores)]
+        self._backend.insert_grid_scores(rows, commit)
 
     def _get_file_name(self, object_type, obj_num):
         """
@@ -370,48 +543,56 @@ class PersistModel:
                                              'time_stamp': self.start_time, 'obj_num': obj_num}
                                           )
 
-    def _save_zipped_pickle(self, obj, file_path_name, protocol=-1):
+    def _get_start_date_from_run_time_stamp(self, run_time_stamp):
         """
-        From http://stackoverflow.com/questions/18474791/decreasing-the-size-of-cpickle-objects
-        Saves a file both pickled and zipped
+        Converts a run_time_stamp (assumed to be the appropriate format) to a
+        date time object
+        :return DateTime instantiation of timestamp.
         """
-        with gzip.open(file_path_name, 'wb') as f:
-            cPickle.dump(obj, f, protocol)
+        return datetime.strptime(run_time_stamp, _RUN_TIME_STAMP_FORMAT)
 
-    def _load_zipped_pickle(self, file_path_name):
-        """
-        From http://stackoverflow.com/questions/18474791/decreasing-the-size-of-cpickle-objects
-        loads a file that has been both pickled and zipped
-        """
-        with gzip.open(file_path_name, 'rb') as f:
-            loaded_object = cPickle.load(f)
-            return loaded_object
 
-    def _create_connection(self):
-        """
-        creates a MySQLdb.connection
-        """
-        ret = MySQLdb.connect(**login_info)
-        """
-        Some of the information in this get's big.  I need to check the value of max_global packet.  If it's already bigger, leave it.  If it's smaller, update
-        """
-        sql = 'select @@global.max_allowed_packet'
-
-        cursor = ret.cursor()
-        cursor.execute(sql)
-        max_allowed_packet_value = cursor.fetchone()
-        if max_allowed_packet_value < _MAX_ALLOWED_PACKET_SIZE:
-            sql = 'SET @@global.max_allowed_packet = {}'.format(_MAX_ALLOWED_PACKET_SIZE)
-            cursor.execute(sql)
+def _to_json_value(value):
+    """
+    json.dumps default for grid search parameters:  NumPy scalars become numbers, anything else (e.g. an estimator)
+    its string representation
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
 
-        return ret
 
+def _parse_grid_params(params, params_json):
+    """
+    Returns the parameters of a grid search result as a dict.  Results saved before params_json existed
+    only have the str() of the dict, which is parsed when it holds nothing but literals.
+    """
+    if params_json:
+        return json.loads(params_json)
+    try:
+        return ast.literal_eval(params)
+    except (ValueError, SyntaxError):
+        return {}
 
 
-    def _get_start_date_from_run_time_stamp(self, run_time_stamp):
-        """
-        Converts a run_time_stamp (assumed to be the appropriate format) to a
-        date time object
-        :return DateTime instantiation of timestamp.
-        """
-        return datetime.strptime(run_time_stamp, _RUN_TIME_STAMP_FORMAT)
\ No newline at end of file
+def _grid_results_frame(rows):
+    """
+    Builds the load_grid_results DataFrame from (run_id, mean, std, params, params_json, cv_scores) rows
+    """
+    records = []
+    param_names = set()
+    num_folds = 0
+    for run_id, mean, std, params, params_json, cv_scores in rows:
+        record = {'run_id': run_id, 'mean': mean, 'std': std}
+        for name, value in _parse_grid_params(params, params_json).items():
+            record['param_' + name] = value
+            param_names.add(name)
+        fold_scores = json.loads(cv_scores) if cv_scores else []
+        for fold, score in enumerate(fold_scores):
+            record['split{}_score'.format(fold)] = score
+        num_folds = max(num_folds, len(fold_scores))
+        records.append(record)
+
+    columns = ['run_id', 'mean', 'std'] + ['param_' + name for name in sorted(param_names)] \
+        + ['split{}_score'.format(fold) for fold in range(num_folds)]
+    return pd.DataFrame.from_records(records, columns=columns)
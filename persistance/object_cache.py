@@ -0,0 +1,87 @@
+"""
+object_cache.py:  a least recently used cache for the objects PersistModel loads from disk, limited by size in bytes.
+"""
+from collections import OrderedDict
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+_DEFAULT_MAX_BYTES = 1024 * 1024 * 1024 #1GB
+
+
+class ObjectCache(object):
+    """
+    Keeps loaded objects until their estimated total size passes max_bytes, then drops the least recently used.
+    Objects bigger than max_bytes on their own aren't kept at all.
+    """
+    def __init__(self, max_bytes=_DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: size budget in bytes.  0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the cached object, marking it as most recently used
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            obj, size = self._entries.pop(key)
+            self._entries[key] = (obj, size)
+            return obj
+
+    def put(self, key, obj, size=None):
+        """
+        Adds obj and evicts the least recently used objects until the cache fits its budget
+        :param size: size of obj in bytes.  Estimated with estimate_size if not passed
+        """
+        size = estimate_size(obj) if size is None else size
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (obj, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _discard(self, key):
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+
+
+def estimate_size(obj, file_path=None):
+    """
+    Estimates how much memory obj holds.
+    Memory mapped arrays count as nothing, they live in the OS page cache.  Arrays and pandas objects are measured;
+    for anything else the size of the file it was loaded from is used (when known), otherwise sys.getsizeof.
+    """
+    if isinstance(obj, np.memmap):
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if file_path is not None and os.path.isfile(file_path):
+        return os.path.getsize(file_path)
+    return sys.getsizeof(obj)
@@ -0,0 +1,212 @@
+"""
+object_store.py:  content addressed storage for the objects PersistModel saves.
+
+Each object is stored once, under objects/<first two hash characters>/<hash><extension> in the object file location,
+where the hash is the sha256 of its serialized bytes.  Objects are hashed while they are written to a temporary file,
+which is then renamed to the hash, or discarded when the store already has it.  The database rows hold the path
+relative to the object file location, and the number of rows pointing at a file is its reference count
+(see collect_garbage).
+
+A store only knows the references of the databases that use it, so it records them in objects/owners (see add_owner)
+and collect_garbage refuses to run when another database uses the store as well.
+"""
+import hashlib
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from persistance import serialization
+
+STORE_DIRECTORY = 'objects'
+_TEMP_DIRECTORY = 'tmp'
+_OWNERS_FILE = 'owners'
+_DEFAULT_MIN_AGE = 60 * 60 #1 hour
+
+
+class ObjectStore(object):
+    """
+    The content addressed store under root (PersistModel's object_file_location)
+    """
+    def __init__(self, root):
+        self.root = root
+        self._owners_added = set()
+
+    def put(self, obj, codec=serialization.CODEC_GZIP, level=None):
+        """
+        Saves obj unless an identical object is already stored.  obj is serialized once:  it is hashed as it is
+        written to a temporary file, which is then renamed to the hash (or deleted if the store already has it).
+        :param codec: one of the serialization CODEC_ constants
+        :param level: compression level.  None uses the codec's default
+        :return the path of the stored file, relative to root
+        """
+        temp_path, digest = serialization.save_object_with_digest(obj, self._temp_file_path(), codec, level)
+        return self._store(temp_path, digest, serialization.file_extension(obj, codec))
+
+    def snapshot(self, obj, codec=serialization.CODEC_GZIP, level=None):
+        """
+        Captures obj as it is now, so it can be stored later (e.g. on another thread) even if obj is changed meanwhile.
+        Pickled objects are serialized straight away (the uncompressed bytes are held in memory), objects saved with
+        the 'array' codec are copied.  Compression and writing are left to Snapshot.write.
+        """
+        return Snapshot(self, obj, codec, level)
+
+    def _put(self, digest, extension, save):
+        """
+        Stores the file under digest + extension unless it is already there
+        :param save: function that writes the object given a path without extension and returns the path written
+        """
+        relative_path = _relative_path(digest, extension)
+        file_path = self.path(relative_path)
+        if os.path.exists(file_path):
+            # Refreshed so collect_garbage treats the file as new until the referencing rows are committed
+            os.utime(file_path, None)
+            return relative_path
+        return self._store(save(self._temp_file_path()), digest, extension)
+
+    def _store(self, temp_path, digest, extension):
+        """
+        Moves a file written to a temporary name under its hash, so a partly written file is never visible there
+        """
+        relative_path = _relative_path(digest, extension)
+        file_path = self.path(relative_path)
+        if os.path.exists(file_path):
+            _remove(temp_path)
+            os.utime(file_path, None)
+            return relative_path
+
+        _make_dirs(os.path.dirname(file_path))
+        try:
+            os.rename(temp_path, file_path)
+        except OSError:
+            # Another process stored the same object first
+            if not os.path.exists(file_path):
+                raise
+            _remove(temp_path)
+        return relative_path
+
+    def path(self, relative_path):
+        """
+        Returns the full path of a stored file
+        """
+        return os.path.join(self.root, *relative_path.split('/'))
+
+    def stored_files(self):
+        """
+        Returns the relative paths of all of the stored files
+        """
+        ret = []
+        store_path = os.path.join(self.root, STORE_DIRECTORY)
+        if not os.path.isdir(store_path):
+            return ret
+        for prefix in sorted(os.listdir(store_path)):
+            if prefix == _TEMP_DIRECTORY or not os.path.isdir(os.path.join(store_path, prefix)):
+                continue
+            for file_name in sorted(os.listdir(os.path.join(store_path, prefix))):
+                ret.append('/'.join([STORE_DIRECTORY, prefix, file_name]))
+        return ret
+
+    def add_owner(self, owner):
+        """
+        Records that the database named owner refers to files in the store (see collect_garbage)
+        """
+        if owner in self._owners_added:
+            return
+        if owner not in self.owners():
+            _make_dirs(os.path.join(self.root, STORE_DIRECTORY))
+            with open(os.path.join(self.root, STORE_DIRECTORY, _OWNERS_FILE), 'a') as f:
+                f.write(owner + '\n')
+        self._owners_added.add(owner)
+
+    def owners(self):
+        """
+        Returns the names of the databases recorded with add_owner
+        """
+        owners_path = os.path.join(self.root, STORE_DIRECTORY, _OWNERS_FILE)
+        if not os.path.exists(owners_path):
+            return []
+        with open(owners_path) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def collect_garbage(self, reference_counts, min_age=_DEFAULT_MIN_AGE, owner=None):
+        """
+        Deletes the stored files nothing refers to any more
+        :param reference_counts: dict of relative path to the number of database rows referring to it
+        :param min_age: files modified less than min_age seconds ago are kept, as they may belong to a save
+            that hasn't been committed yet
+        :param owner: the database reference_counts come from.  Nothing is deleted if any other database has been
+            recorded as using the store (see add_owner):  its references aren't in reference_counts.
+        :return the relative paths deleted
+        """
+        others = [name for name in self.owners() if name != owner]
+        if others:
+            raise Exception('The object store in {} is also used by {}, collecting garbage would delete their objects'
+                            .format(self.root, ', '.join(others)))
+        ret = []
+        now = time.time()
+        for relative_path in self.stored_files():
+            if reference_counts.get(relative_path, 0) > 0:
+                continue
+            file_path = self.path(relative_path)
+            if now - os.path.getmtime(file_path) < min_age:
+                continue
+            _remove(file_path)
+            ret.append(relative_path)
+        return ret
+
+    def _temp_file_path(self):
+        temp_directory = os.path.join(self.root, STORE_DIRECTORY, _TEMP_DIRECTORY)
+        _make_dirs(temp_directory)
+        return os.path.join(temp_directory, uuid.uuid4().hex)
+
+
+class Snapshot(object):
+    """
+    An object captured by ObjectStore.snapshot, waiting to be stored
+    """
+    def __init__(self, store, obj, codec, level):
+        self._store = store
+        self._codec = codec
+        self._level = level
+        self._extension = serialization.file_extension(obj, codec)
+        if codec == serialization.CODEC_ARRAY:
+            self._obj = obj.copy(deep=True) if isinstance(obj, (pd.DataFrame, pd.Series)) else np.array(obj, copy=True)
+            self._data = None
+        else:
+            self._obj = None
+            self._data = serialization.dumps(obj)
+
+    def write(self):
+        """
+        Stores the snapshot and returns its path relative to the store root (see ObjectStore.put)
+        """
+        if self._data is None:
+            return self._store.put(self._obj, self._codec, self._level)
+        return self._store._put(hashlib.sha256(self._data).hexdigest(), self._extension,
+                                lambda temp_path: serialization.save_serialized(self._data, temp_path, self._codec,
+                                                                                self._level))
+
+
+def _relative_path(digest, extension):
+    return '/'.join([STORE_DIRECTORY, digest[:2], digest + extension])
+
+
+def _make_dirs(path):
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+def _remove(path):
+    """
+    Removes a file, or a directory written by the 'array' codec
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
@@ -0,0 +1,446 @@
+"""
+serialization.py:  saving and loading the objects PersistModel stores on disk.
+
+Objects are pickled and written through a codec ('none', 'gzip', 'zstd' or 'lz4').  zstd and lz4 are
+only available when the zstandard / lz4 packages are installed; zstd compresses on all cores.
+The codec is recorded in the file extension, so any file can be loaded again regardless of the
+codec PersistModel is currently configured with.  Files without a known extension are the original
+gzipped pickles.
+
+Where pickle protocol 5 is available, large buffers (e.g. NumPy array data) are written out of band,
+straight from the array's memory rather than being copied into the pickle stream.
+
+The 'array' codec isn't a pickle:  NumPy arrays are saved as raw .npy files and DataFrames/Series as a
+directory holding one .npy per dtype block plus a small json header.  These are opened with np.load(mmap_mode='r'),
+so loading is instant and processes reading the same file share the OS page cache.
+"""
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import struct
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+CODEC_NONE = 'none'
+CODEC_GZIP = 'gzip'
+CODEC_ZSTD = 'zstd'
+CODEC_LZ4 = 'lz4'
+CODEC_ARRAY = 'array'
+
+_EXTENSIONS = {CODEC_NONE: '.pkl', CODEC_GZIP: '.pkl.gz', CODEC_ZSTD: '.pkl.zst', CODEC_LZ4: '.pkl.lz4'}
+_MAGIC = b'DMBPKL\n'
+_LENGTH = struct.Struct('<Q')
+_READ_CHUNK_SIZE = 16 * 1024 * 1024
+_PICKLE_PROTOCOL = min(pickle.HIGHEST_PROTOCOL, 5)
+_ARRAY_EXTENSION = '.npy'
+_FRAME_EXTENSION = '.frame'
+_FRAME_HEADER = 'header.json'
+
+try:
+    _JSON_NUMBER_TYPES = (int, long, float)
+except NameError:
+    _JSON_NUMBER_TYPES = (int, float)
+
+
+def available_codecs():
+    """
+    Returns the codecs that can be used in this environment
+    """
+    ret = [CODEC_NONE, CODEC_GZIP]
+    if zstandard is not None:
+        ret.append(CODEC_ZSTD)
+    if lz4 is not None:
+        ret.append(CODEC_LZ4)
+    return ret
+
+
+def codec_from_file_name(file_name):
+    """
+    Returns the codec a file was written with, based on its extension.
+    Files without a known extension are the original gzipped pickles (None is returned)
+    """
+    for codec, extension in _EXTENSIONS.items():
+        if file_name.endswith(extension):
+            return codec
+    if file_name.endswith(_ARRAY_EXTENSION) or file_name.endswith(_FRAME_EXTENSION):
+        return CODEC_ARRAY
+    return None
+
+
+def supports_array_format(obj):
+    """
+    True if obj can be saved with the 'array' codec:  an ndarray, or a DataFrame/Series with plain NumPy dtypes,
+    a single level index with a plain NumPy dtype, and names and column labels that are strings, ints, floats or None.
+    Anything else (MultiIndex, CategoricalIndex, timezone aware or frequency indexes, tuple or NumPy scalar names,
+    bool labels, ...) would lose information in the json header, so it is pickled instead.
+    """
+    if isinstance(obj, np.ndarray):
+        return not isinstance(obj, np.matrix) and obj.dtype != object
+    if isinstance(obj, pd.Series):
+        if not _is_json_label(obj.name):
+            return False
+        obj = obj.to_frame()
+    if isinstance(obj, pd.DataFrame):
+        return all(isinstance(dtype, np.dtype) for dtype in obj.dtypes) \
+            and _is_plain_index(obj.index) and not isinstance(obj.columns, (pd.MultiIndex, pd.CategoricalIndex)) \
+            and all(_is_json_label(label) for label in [obj.index.name, obj.columns.name] + list(obj.columns))
+    return False
+
+
+def file_extension(obj, codec):
+    """
+    Returns the extension save_object adds when saving obj with codec
+    """
+    if codec == CODEC_ARRAY:
+        return _ARRAY_EXTENSION if isinstance(obj, np.ndarray) else _FRAME_EXTENSION
+    return _EXTENSIONS[codec]
+
+
+def object_digest(obj):
+    """
+    Returns the sha256 hex digest of obj's serialized (uncompressed) bytes.
+    Only the hash is computed, nothing is written or compressed.
+    """
+    writer = _HashingWriter()
+    dump(obj, writer)
+    return writer.hexdigest()
+
+
+def save_object(obj, file_path, codec=CODEC_GZIP, level=None):
+    """
+    Pickles obj to file_path plus the codec's extension
+    :param obj: the object to save
+    :param file_path: path of the file without extension
+    :param codec: one of the CODEC_ constants
+    :param level: compression level.  None uses the codec's default
+    :return the path of the file written
+    """
+    return _save_object(obj, file_path, codec, level)
+
+
+def save_object_with_digest(obj, file_path, codec=CODEC_GZIP, level=None):
+    """
+    Saves obj like save_object, hashing what is written on the way so obj is only serialized once
+    :return (the path of the file written, sha256 hex digest).  For pickled objects the digest is that of the
+        uncompressed bytes (i.e. object_digest(obj)), for the 'array' codec that of the .npy files and header written.
+    """
+    the_hash = hashlib.sha256()
+    file_path = _save_object(obj, file_path, codec, level, the_hash)
+    return file_path, the_hash.hexdigest()
+
+
+def _save_object(obj, file_path, codec, level, the_hash=None):
+    if codec == CODEC_ARRAY:
+        return _save_array(obj, file_path, the_hash)
+
+    file_path += _EXTENSIONS[codec]
+    with _open_for_write(file_path, codec, level) as f:
+        dump(obj, _hashing(f, the_hash))
+    return file_path
+
+
+def dumps(obj):
+    """
+    Returns the bytes dump writes for obj (uncompressed), e.g. to snapshot an object and write it out later
+    with save_serialized.  hashlib.sha256 of them equals object_digest(obj).
+    """
+    f = io.BytesIO()
+    dump(obj, f)
+    return f.getvalue()
+
+
+def save_serialized(data, file_path, codec=CODEC_GZIP, level=None):
+    """
+    Writes bytes from dumps to file_path plus the codec's extension, as save_object would have written the object
+    :return the path of the file written
+    """
+    file_path += _EXTENSIONS[codec]
+    with _open_for_write(file_path, codec, level) as f:
+        f.write(data)
+    return file_path
+
+
+def load_object(file_path, mmap_mode='r'):
+    """
+    Loads an object saved by save_object (or one of the original gzipped pickles)
+    :param mmap_mode: how 'array' codec files are memory mapped (see np.load).  'r' gives read only arrays
+    """
+    codec = codec_from_file_name(file_path)
+    if codec == CODEC_ARRAY:
+        return _load_array(file_path, mmap_mode)
+    if codec is None:
+        with gzip.open(file_path, 'rb') as f:
+            return pickle.load(f)
+
+    with _open_for_read(file_path, codec) as f:
+        return load(f)
+
+
+def dump(obj, f):
+    """
+    Writes obj to the binary file f:  a header, the pickle stream and then any out of band buffers
+    """
+    buffers = []
+    if _PICKLE_PROTOCOL >= 5:
+        data = pickle.dumps(obj, protocol=_PICKLE_PROTOCOL, buffer_callback=buffers.append)
+    else:
+        data = pickle.dumps(obj, protocol=_PICKLE_PROTOCOL)
+
+    f.write(_MAGIC)
+    f.write(_LENGTH.pack(len(data)))
+    f.write(data)
+    f.write(_LENGTH.pack(len(buffers)))
+    for buf in buffers:
+        raw = buf.raw()
+        f.write(_LENGTH.pack(raw.nbytes))
+        f.write(raw)
+
+
+def load(f):
+    """
+    Reads an object written by dump from the binary file f
+    """
+    if f.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError('Not a file written by persistance.serialization')
+
+    data = _read_exact(f, _read_length(f))
+    buffers = [_read_exact(f, _read_length(f)) for i in range(_read_length(f))]
+    if _PICKLE_PROTOCOL >= 5:
+        return pickle.loads(data, buffers=buffers)
+    return pickle.loads(bytes(data))
+
+
+def _save_array(obj, file_path, the_hash=None):
+    """
+    Saves an ndarray as file_path.npy, or a DataFrame/Series as the directory file_path.frame
+    Frame columns are grouped by dtype and each group saved as one Fortran ordered 2D array, which
+    pandas can wrap without copying when the frame has a single dtype.
+    The directory is written under a temporary name and renamed once complete.
+    """
+    if not supports_array_format(obj):
+        raise ValueError('{} can not be saved with the array codec'.format(type(obj).__name__))
+    if isinstance(obj, np.ndarray):
+        file_path += _ARRAY_EXTENSION
+        with open(file_path, 'wb') as f:
+            np.save(_hashing(f, the_hash), obj)
+        return file_path
+
+    file_path += _FRAME_EXTENSION
+    temp_path = '{}.{}.tmp'.format(file_path, uuid.uuid4().hex)
+    os.makedirs(temp_path)
+    try:
+        _save_frame(obj, temp_path, the_hash)
+        os.rename(temp_path, file_path)
+    except Exception:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+    return file_path
+
+
+def _save_frame(obj, file_path, the_hash=None):
+    """
+    Writes the blocks, index and header of a DataFrame/Series into the directory file_path
+    :param the_hash: hashlib object updated with the files' contents, in the order they are written
+    """
+    header = {'kind': 'frame', 'blocks': []}
+    if isinstance(obj, pd.Series):
+        header.update({'kind': 'series', 'name': obj.name})
+        obj = obj.to_frame()
+    header['columns'] = list(obj.columns)
+    header['columns_name'] = obj.columns.name
+
+    dtypes = obj.dtypes.values
+    for block_num, dtype in enumerate(_unique_in_order(dtypes)):
+        positions = [position for position, col_dtype in enumerate(dtypes) if col_dtype == dtype]
+        block_file = 'block_{:03d}.npy'.format(block_num)
+        _save_npy(os.path.join(file_path, block_file), np.asfortranarray(obj.iloc[:, positions].values), the_hash)
+        header['blocks'].append({'file': block_file, 'positions': positions})
+
+    header['index'] = None
+    if not _is_default_index(obj.index):
+        header['index'] = 'index.npy'
+        header['index_name'] = obj.index.name
+        _save_npy(os.path.join(file_path, header['index']), np.asarray(obj.index.values), the_hash)
+
+    with open(os.path.join(file_path, _FRAME_HEADER), 'wb') as f:
+        _hashing(f, the_hash).write(json.dumps(header, sort_keys=True).encode('utf-8'))
+
+
+def _save_npy(file_path, array, the_hash=None):
+    with open(file_path, 'wb') as f:
+        np.save(_hashing(f, the_hash), array)
+
+
+def _hashing(f, the_hash):
+    """
+    Returns f, wrapped so what is written is also hashed when the_hash is passed
+    """
+    return f if the_hash is None else _HashingWriter(f, the_hash)
+
+
+def _load_array(file_path, mmap_mode):
+    if file_path.endswith(_ARRAY_EXTENSION):
+        return _load_npy(file_path, mmap_mode)
+
+    with open(os.path.join(file_path, _FRAME_HEADER)) as f:
+        header = json.load(f)
+
+    index = None
+    if header['index'] is not None:
+        values = _load_npy(os.path.join(file_path, header['index']), mmap_mode)
+        index = pd.Index(values, dtype=values.dtype, name=header['index_name'])
+
+    columns = header['columns']
+    blocks = header['blocks']
+    if len(blocks) == 1:
+        ret = pd.DataFrame(_load_npy(os.path.join(file_path, blocks[0]['file']), mmap_mode),
+                           index=index, columns=columns, copy=False)
+    else:
+        # Mixed dtypes:  pandas copies the blocks when they are put together
+        ret = pd.concat([pd.DataFrame(_load_npy(os.path.join(file_path, block['file']), mmap_mode),
+                                      index=index, columns=block['positions'], copy=False) for block in blocks], axis=1)
+        ret = ret[list(range(len(columns)))]
+        ret.columns = columns
+
+    if header['kind'] == 'series':
+        return ret.iloc[:, 0].rename(header['name'])
+    ret.columns.name = header.get('columns_name')
+    return ret
+
+
+def _load_npy(file_path, mmap_mode):
+    """
+    Memory maps the .npy file.  Object arrays can't be mapped, those are read into memory.
+    """
+    try:
+        return np.load(file_path, mmap_mode=mmap_mode)
+    except ValueError:
+        return np.load(file_path, allow_pickle=True)
+
+
+def _is_plain_index(index):
+    """
+    True for an index _save_array can store as one .npy and rebuild exactly
+    """
+    return not isinstance(index, (pd.MultiIndex, pd.CategoricalIndex)) and isinstance(index.dtype, np.dtype) \
+        and getattr(index, 'freq', None) is None
+
+
+def _is_json_label(value):
+    """
+    True for a name or label the json header stores and loads unchanged:  None, a string, an int or a float.
+    bool and NumPy scalars are excluded, json would give them back as plain ints or floats.
+    """
+    return value is None or _is_text(value) or type(value) in _JSON_NUMBER_TYPES
+
+
+def _is_default_index(index):
+    """
+    True for the default 0..n-1 index, which doesn't need to be saved
+    """
+    return index.name is None and index.dtype.kind == 'i' and np.array_equal(index.values, np.arange(len(index)))
+
+
+def _unique_in_order(values):
+    ret = []
+    for value in values:
+        if value not in ret:
+            ret.append(value)
+    return ret
+
+
+def _is_text(value):
+    try:
+        return isinstance(value, basestring)
+    except NameError:
+        return isinstance(value, str)
+
+
+class _HashingWriter(object):
+    """
+    File like object that hashes what is written to it, and passes it on to f if given
+    """
+    def __init__(self, f=None, the_hash=None):
+        self._f = f
+        self._hash = hashlib.sha256() if the_hash is None else the_hash
+
+    def write(self, data):
+        self._hash.update(data)
+        if self._f is not None:
+            self._f.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def _read_length(f):
+    return _LENGTH.unpack(_read_exact(f, _LENGTH.size))[0]
+
+
+def _read_exact(f, size):
+    """
+    Reads size bytes into a (writable) bytearray, a chunk at a time so no second full size copy is made
+    """
+    ret = bytearray(size)
+    view = memoryview(ret)
+    position = 0
+    while position < size:
+        chunk = f.read(min(size - position, _READ_CHUNK_SIZE))
+        if not chunk:
+            raise EOFError('Unexpected end of file')
+        view[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    return ret
+
+
+def _open_for_write(file_path, codec, level):
+    if codec == CODEC_NONE:
+        return open(file_path, 'wb')
+    if codec == CODEC_GZIP:
+        return gzip.open(file_path, 'wb', 9 if level is None else level)
+    if codec == CODEC_ZSTD:
+        _check_installed(zstandard, codec)
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=-1)
+        return compressor.stream_writer(open(file_path, 'wb'))
+    if codec == CODEC_LZ4:
+        _check_installed(lz4, codec)
+        return lz4.frame.open(file_path, 'wb', compression_level=0 if level is None else level)
+    raise ValueError('Unknown codec {}'.format(codec))
+
+
+def _open_for_read(file_path, codec):
+    if codec == CODEC_NONE:
+        return open(file_path, 'rb')
+    if codec == CODEC_GZIP:
+        return gzip.open(file_path, 'rb')
+    if codec == CODEC_ZSTD:
+        _check_installed(zstandard, codec)
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'))
+    if codec == CODEC_LZ4:
+        _check_installed(lz4, codec)
+        return lz4.frame.open(file_path, 'rb')
+    raise ValueError('Unknown codec {}'.format(codec))
+
+
+def _check_installed(module, codec):
+    if module is None:
+        raise Exception('The {} codec needs its package installed (zstandard / lz4)'.format(codec))
@@ -0,0 +1,35 @@
+from unittest import TestCase
+from data_preparation.transformers import LetterExtractionTransformer, NaNCountTransformer, transform_csv, write_chunks
+from sklearn.pipeline import FeatureUnion
+from io import StringIO
+import pandas as pd
+
+
+class BaseChunkedTransformsTestCase(TestCase):
+    def setUp(self):
+        self.csv = u'col1,col2\nab,1\nc,\nxyz,3\n,4\n'
+        self.union = FeatureUnion([('nan_count', NaNCountTransformer()),
+                                   ('letters', LetterExtractionTransformer(['col1'], max_width=2, as_codes=True))])
+
+    def tearDown(self):
+        self.csv = None
+        self.union = None
+
+
+class TestChunkedTransforms(BaseChunkedTransformsTestCase):
+    def test_transform_chunks_matches_transform(self):
+        expected = self.union.transform(pd.read_csv(StringIO(self.csv)))
+        chunks = list(transform_csv(self.union, StringIO(self.csv), chunksize=3))
+        self.assertEqual(2, len(chunks))
+        self.assertListEqual(expected.tolist(), chunks[0].tolist() + chunks[1].tolist())
+
+    def test_transformer_transform_chunks(self):
+        chunks = pd.read_csv(StringIO(self.csv), chunksize=2)
+        results = list(NaNCountTransformer().transform_chunks(chunks))
+        self.assertListEqual([0, 1, 0, 1], list(pd.concat(results).iloc[:, 0]))
+
+    def test_write_chunks(self):
+        out = StringIO()
+        row_count = write_chunks(transform_csv(self.union, StringIO(self.csv), chunksize=3), out)
+        self.assertEqual(4, row_count)
+        self.assertEqual(5, len(out.getvalue().splitlines()))
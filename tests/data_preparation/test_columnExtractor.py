@@ -0,0 +1,39 @@
+from unittest import TestCase
+from data_preparation.transformers import ColumnExtractor
+import pandas as pd
+import numpy as np
+
+
+class BaseColumnExtractorTestCase(TestCase):
+    def setUp(self):
+        self.test_df = pd.DataFrame(np.arange(12.0).reshape(3, 4), columns=['col1', 'col2', 'col3', 'col4'])
+
+    def tearDown(self):
+        self.test_df = None
+
+
+class TestColumnExtractor(BaseColumnExtractorTestCase):
+    def test_fit_transform(self):
+        result = ColumnExtractor(['col4', 'col1']).fit_transform(self.test_df)
+        self.assertListEqual(['col4', 'col1'], list(result.columns))
+        self.assertListEqual([3, 7, 11], list(result['col4']))
+
+    def test_transform_as_array(self):
+        result = ColumnExtractor(['col2', 'col3'], as_array=True).fit_transform(self.test_df)
+        self.assertListEqual([[1, 2], [5, 6], [9, 10]], result.tolist())
+
+    def test_transform_reordered_columns(self):
+        extractor = ColumnExtractor(['col2', 'col3']).fit(self.test_df)
+        result = extractor.transform(self.test_df[['col3', 'col4', 'col2', 'col1']])
+        self.assertListEqual(['col2', 'col3'], list(result.columns))
+        self.assertListEqual([1, 5, 9], list(result['col2']))
+
+    def test_missing_column(self):
+        with self.assertRaises(KeyError):
+            ColumnExtractor(['col5']).fit(self.test_df)
+
+    def test_transform_as_array_mixed_dtypes(self):
+        self.test_df['text'] = ['a', 'b', 'c']
+        result = ColumnExtractor(['col1', 'col2'], as_array=True).fit_transform(self.test_df)
+        self.assertEqual(np.float64, result.dtype)
+        self.assertTrue(np.array_equal([[0, 1], [4, 5], [8, 9]], result))
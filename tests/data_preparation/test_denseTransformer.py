@@ -0,0 +1,47 @@
+from unittest import TestCase
+from data_preparation import transformers
+from data_preparation.transformers import DenseTransformer
+import scipy.sparse as sp
+import numpy as np
+import tempfile
+import shutil
+
+
+class BaseDenseTransformerTestCase(TestCase):
+    def setUp(self):
+        self.expected = np.array([[1, 0, 0], [0, 2, 0], [0, 0, 3], [4, 0, 5], [0, 6, 0]], dtype=np.float64)
+        self.test_matrix = sp.csr_matrix(self.expected)
+        self.scratch_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.test_matrix = None
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+class TestDenseTransformer(BaseDenseTransformerTestCase):
+    def test_transform_returns_ndarray(self):
+        result = DenseTransformer().fit_transform(self.test_matrix)
+        self.assertFalse(isinstance(result, np.matrix))
+        self.assertTrue(np.array_equal(self.expected, result))
+
+    def test_transform_in_blocks(self):
+        result = DenseTransformer(block_size=2, dtype=np.float32).fit_transform(sp.csc_matrix(self.expected))
+        self.assertEqual(np.float32, result.dtype)
+        self.assertTrue(np.array_equal(self.expected, result))
+
+    def test_transform_to_memmap(self):
+        result = DenseTransformer(block_size=2, memmap_dir=self.scratch_dir).fit_transform(self.test_matrix)
+        self.assertTrue(isinstance(result, np.memmap))
+        self.assertTrue(np.array_equal(self.expected, result))
+        del result
+
+    def test_transform_to_memmap_default_blocks(self):
+        original_block_bytes = transformers._MEMMAP_BLOCK_BYTES
+        transformers._MEMMAP_BLOCK_BYTES = 2 * 3 * 8 # two rows at a time
+        try:
+            result = DenseTransformer(memmap_dir=self.scratch_dir).fit_transform(self.test_matrix)
+        finally:
+            transformers._MEMMAP_BLOCK_BYTES = original_block_bytes
+        self.assertTrue(isinstance(result, np.memmap))
+        self.assertTrue(np.array_equal(self.expected, result))
+        del result
@@ -0,0 +1,90 @@
+from unittest import TestCase
+from data_preparation import transformers
+from data_preparation.transformers import ColumnExtractor
+from sklearn.pipeline import FeatureUnion
+import numpy as np
+import json
+import io
+
+
+class BaseEncodeTransformerTestCase(TestCase):
+    def setUp(self):
+        self.transformer = ColumnExtractor(['v1', 'v2'])
+
+    def tearDown(self):
+        pass
+
+
+class TestEncodeTransformer(BaseEncodeTransformerTestCase):
+    def test_small_vars_included(self):
+        result = json.loads(transformers.encode_transformer('column_extractor', self.transformer))
+        self.assertEqual('column_extractor', result['A. label'])
+        self.assertListEqual(['v1', 'v2'], result['D. vars']['cols'])
+
+    def test_large_array_summarized(self):
+        self.transformer.big_ = np.zeros((1000, 1000))
+        result = json.loads(transformers.encode_transformer('column_extractor', self.transformer))
+        summary = result['D. vars']['big_']
+        self.assertEqual([1000, 1000], summary['shape'])
+        self.assertEqual('float64', summary['dtype'])
+        self.assertEqual(40, len(summary['sha1']))
+
+    def test_large_dict_summarized(self):
+        self.transformer.vocabulary_ = dict(('word{}'.format(i), i) for i in range(200000))
+        result = json.loads(transformers.encode_transformer('column_extractor', self.transformer))
+        self.assertEqual({'summary': 'dict', 'length': 200000}, result['D. vars']['vocabulary_'])
+        self.assertListEqual(['v1', 'v2'], result['D. vars']['cols'])
+
+    def test_vars_budget(self):
+        self.transformer.a = 'x' * 100
+        self.transformer.b = 'y' * 100
+        result = transformers.create_transformer_tree('column_extractor', self.transformer, max_vars_bytes=150)
+        self.assertEqual('x' * 100, result['D. vars']['a'])
+        self.assertEqual({'summary': 'str', 'length': 100}, result['D. vars']['b'])
+
+    def test_stream_to_file(self):
+        the_transformer = FeatureUnion([('column_extractor', self.transformer), ('other', ColumnExtractor(['v3']))])
+        fp = io.StringIO()
+        self.assertIsNone(transformers.encode_transformer('feature_union', the_transformer, fp=fp))
+        self.assertEqual(transformers.encode_transformer('feature_union', the_transformer), fp.getvalue())
+
+
+class TestTransformerTreeCache(BaseEncodeTransformerTestCase):
+    def setUp(self):
+        super(TestTransformerTreeCache, self).setUp()
+        transformers.clear_transformer_tree_cache()
+
+    def tearDown(self):
+        transformers.clear_transformer_tree_cache()
+
+    def test_identical_unfitted_trees_reused(self):
+        first = transformers.create_transformer_tree('union', FeatureUnion([('ce', ColumnExtractor(['v1']))]))
+        second = transformers.create_transformer_tree('union', FeatureUnion([('ce', ColumnExtractor(['v1']))]))
+        self.assertIs(first, second)
+
+    def test_different_params_not_reused(self):
+        first = transformers.create_transformer_tree('union', FeatureUnion([('ce', ColumnExtractor(['v1']))]))
+        second = transformers.create_transformer_tree('union', FeatureUnion([('ce', ColumnExtractor(['v2']))]))
+        self.assertIsNot(first, second)
+        self.assertListEqual(['v2'], second['C. children'][0]['D. vars']['cols'])
+
+    def test_fitted_not_cached(self):
+        self.transformer.positions_ = [0, 1]
+        first = transformers.create_transformer_tree('ce', self.transformer)
+        second = transformers.create_transformer_tree('ce', self.transformer)
+        self.assertIsNot(first, second)
+        self.assertEqual(0, len(transformers._tree_cache))
+
+    def test_unknown_parameter_not_cached(self):
+        self.transformer.something = object()
+        transformers.create_transformer_tree('ce', self.transformer)
+        self.assertEqual(0, len(transformers._tree_cache))
+
+
+class TestFlattenTransformerTree(BaseEncodeTransformerTestCase):
+    def test_flatten(self):
+        tree = transformers.create_transformer_tree('union', FeatureUnion([('ce', self.transformer)]))
+        rows = list(transformers.flatten_transformer_tree(tree))
+        self.assertEqual(('union', 'sklearn.pipeline.FeatureUnion', None, None), rows[0])
+        self.assertIn(('union/ce', 'data_preparation.transformers.ColumnExtractor', 'cols', '["v1","v2"]'), rows)
+        self.assertIn(('union/ce', 'data_preparation.transformers.ColumnExtractor', 'as_array', 'false'), rows)
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from data_preparation.transformers import LetterCountTransformer
 import pandas as pd
+import numpy as np
 
 
 
@@ -17,11 +18,30 @@ class BaseLetterCountTransformerTestCase(TestCase):
 
 class TestLetterCountTransformer(BaseLetterCountTransformerTestCase):
     def test_fit_transform_one_column(self):
-        expected = pd.DataFrame({0: {0: 1, 1: 2, 2: 3}})
+        expected = pd.DataFrame({0: {0: 1, 1: 2, 2: 3}}, dtype=np.float32)
         self.assertTrue(expected.equals(LetterCountTransformer(['col1']).fit_transform(self.test_df)))
 
     def test_fit_transform_multiple_columns(self):
-        expected = pd.DataFrame({0: {0: 1, 1: 2, 2: 3}, 1: {0: 3, 1: 1, 2: 2}, 2: {0: 4, 1: 3, 2: 7}})
+        expected = pd.DataFrame({0: {0: 1, 1: 2, 2: 3}, 1: {0: 3, 1: 1, 2: 2}, 2: {0: 4, 1: 3, 2: 7}}, dtype=np.float32)
 
         self.assertTrue(expected.equals(LetterCountTransformer(['col1', 'col2', 'col3']).fit_transform(self.test_df)))
 
+    def test_fit_transform_non_strings(self):
+        test_df = pd.DataFrame({'col1': ['ab', np.nan, 5]})
+        result = LetterCountTransformer(['col1']).fit_transform(test_df)
+        self.assertEqual(2, result[0][0])
+        self.assertTrue(np.isnan(result[0][1]))
+        self.assertTrue(np.isnan(result[0][2]))
+
+    def test_fit_transform_mixed_cell_types(self):
+        test_df = pd.DataFrame({'col1': ['abc', ['a', 'b', 'c'], ('d', 'e'), {'f': 1}, 'gh']})
+        result = LetterCountTransformer(['col1']).fit_transform(test_df)
+        self.assertEqual(3, result[0][0])
+        self.assertTrue(np.isnan(result[0][1:4]).all())
+        self.assertEqual(2, result[0][4])
+
+    def test_fit_transform_integer_dtype(self):
+        test_df = pd.DataFrame({'col1': ['ab', np.nan, 'cde']})
+        result = LetterCountTransformer(['col1'], dtype=np.int32).fit_transform(test_df)
+        self.assertEqual(np.int32, result[0].dtype)
+        self.assertListEqual([2, 0, 3], list(result[0]))
@@ -1,6 +1,7 @@
 from unittest import TestCase
 from data_preparation.transformers import LetterExtractionTransformer
 import pandas as pd
+import numpy as np
 
 class BaseLetterExtractionTransformerTestCase(TestCase):
     def setUp(self):
@@ -20,5 +21,25 @@ class TestLetterExtractionTransformer(BaseLetterExtractionTransformerTestCase):
 
         self.assertTrue(expected.equals(LetterExtractionTransformer(['col1', 'col2', 'col3']).fit_transform(self.test_df)))
 
-
-
+    def test_transform_as_codes(self):
+        expected = np.array([[97, 0, 0], [98, 99, 0], [100, 101, 102]], dtype=np.uint32)
+        result = LetterExtractionTransformer(['col1'], as_codes=True).fit_transform(self.test_df)
+        self.assertEqual(expected.dtype, result.dtype)
+        self.assertTrue(np.array_equal(expected, result))
+
+    def test_transform_as_codes_max_width_and_pad_value(self):
+        expected = np.array([[97, -1, 109, 110], [98, 99, 113, 114], [100, 101, 116, 117]])
+        result = LetterExtractionTransformer(['col1', 'col3'], max_width=2, pad_value=-1, as_codes=True).fit_transform(self.test_df)
+        self.assertTrue(np.array_equal(expected, result))
+
+    def test_transform_non_strings_are_padded(self):
+        test_df = pd.DataFrame({'col1': ['ab', np.nan, 5]})
+        expected = np.array([[97, 98], [0, 0], [0, 0]], dtype=np.uint32)
+        result = LetterExtractionTransformer(['col1'], as_codes=True).fit_transform(test_df)
+        self.assertTrue(np.array_equal(expected, result))
+
+    def test_transform_parallel_matches_serial(self):
+        columns = ['col1', 'col2', 'col3']
+        expected = LetterExtractionTransformer(columns, as_codes=True).fit_transform(self.test_df)
+        result = LetterExtractionTransformer(columns, as_codes=True, n_jobs=2).fit_transform(self.test_df)
+        self.assertTrue(np.array_equal(expected, result))
@@ -0,0 +1,51 @@
+from unittest import TestCase
+from data_preparation.transformers import MultiColumnLabelEncoder
+import pandas as pd
+
+
+class BaseMultiColumnLabelEncoderTestCase(TestCase):
+    def setUp(self):
+        self.train_df = pd.DataFrame({'col1': ['b', 'a', 'c', 'a'], 'col2': ['x', 'y', 'x', 'z'], 'col3': [1, 2, 3, 4]})
+        self.test_df = pd.DataFrame({'col1': ['c', 'd', 'a'], 'col2': ['z', 'z', 'w'], 'col3': [5, 6, 7]})
+
+    def tearDown(self):
+        self.train_df = None
+        self.test_df = None
+
+
+class TestMultiColumnLabelEncoder(BaseMultiColumnLabelEncoderTestCase):
+    def test_fit_transform_columns(self):
+        result = MultiColumnLabelEncoder(['col1', 'col2']).fit_transform(self.train_df)
+        self.assertListEqual([1, 0, 2, 0], list(result['col1']))
+        self.assertListEqual([0, 1, 0, 2], list(result['col2']))
+        self.assertListEqual([1, 2, 3, 4], list(result['col3']))
+
+    def test_fit_transform_all_columns(self):
+        result = MultiColumnLabelEncoder().fit_transform(self.train_df)
+        self.assertListEqual([0, 1, 2, 3], list(result['col3']))
+
+    def test_transform_uses_fitted_codes(self):
+        encoder = MultiColumnLabelEncoder(['col1', 'col2']).fit(self.train_df)
+        result = encoder.transform(self.test_df)
+        self.assertListEqual([2, -1, 0], list(result['col1']))
+        self.assertListEqual([2, 2, -1], list(result['col2']))
+
+    def test_transform_unknown_value(self):
+        encoder = MultiColumnLabelEncoder(['col1'], unknown_value=99).fit(self.train_df)
+        self.assertListEqual([2, 99, 0], list(encoder.transform(self.test_df)['col1']))
+
+    def test_transform_before_fit(self):
+        with self.assertRaises(Exception):
+            MultiColumnLabelEncoder(['col1']).transform(self.test_df)
+
+    def test_parallel_threads(self):
+        encoder = MultiColumnLabelEncoder(['col1', 'col2'], n_jobs=2, backend='threading').fit(self.train_df)
+        result = encoder.transform(self.test_df)
+        self.assertListEqual([2, -1, 0], list(result['col1']))
+        self.assertListEqual([2, 2, -1], list(result['col2']))
+
+    def test_parallel_processes(self):
+        encoder = MultiColumnLabelEncoder(['col1', 'col2'], n_jobs=2, backend='multiprocessing').fit(self.train_df)
+        result = encoder.transform(self.test_df)
+        self.assertListEqual([2, -1, 0], list(result['col1']))
+        self.assertListEqual([2, 2, -1], list(result['col2']))
@@ -0,0 +1,34 @@
+from unittest import TestCase
+from data_preparation.transformers import NaNCountTransformer
+import pandas as pd
+import numpy as np
+
+
+class BaseNaNCountTransformerTestCase(TestCase):
+    def setUp(self):
+        self.test_df = pd.DataFrame({'col1': [1, np.nan, 3, np.nan], 'col2': ['a', None, 'b', 'c'], 'col3': [np.nan, np.nan, 1, 2]})
+
+    def tearDown(self):
+        self.test_df = None
+
+
+class TestNaNCountTransformer(BaseNaNCountTransformerTestCase):
+    def test_fit_transform(self):
+        result = NaNCountTransformer().fit_transform(self.test_df)
+        self.assertListEqual([1, 3, 0, 1], list(result[0]))
+        self.assertTrue(np.allclose([1 / 3.0, 1, 0, 1 / 3.0], result[1]))
+        self.assertEqual(np.float32, result[0].dtype)
+
+    def test_fit_transform_column_subset(self):
+        result = NaNCountTransformer(['col1', 'col2'], dtype=np.float64).fit_transform(self.test_df)
+        self.assertListEqual([0, 2, 0, 1], list(result[0]))
+        self.assertListEqual([0, 1, 0, 0.5], list(result[1]))
+        self.assertEqual(np.float64, result[1].dtype)
+
+    def test_index_is_preserved(self):
+        self.test_df.index = [10, 11, 12, 13]
+        self.assertListEqual([10, 11, 12, 13], list(NaNCountTransformer().fit_transform(self.test_df).index))
+
+    def test_integer_dtype_rejected(self):
+        with self.assertRaises(ValueError):
+            NaNCountTransformer(dtype=np.int32).fit_transform(self.test_df)
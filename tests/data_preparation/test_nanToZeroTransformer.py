@@ -0,0 +1,38 @@
+from unittest import TestCase
+from data_preparation.transformers import NanToZeroTransformer
+import scipy.sparse as sp
+import pandas as pd
+import numpy as np
+
+
+class BaseNanToZeroTransformerTestCase(TestCase):
+    def setUp(self):
+        self.test_array = np.array([[1, np.nan], [np.nan, 2]], dtype=np.float32)
+
+    def tearDown(self):
+        self.test_array = None
+
+
+class TestNanToZeroTransformer(BaseNanToZeroTransformerTestCase):
+    def test_transform_copies_by_default(self):
+        result = NanToZeroTransformer().fit_transform(self.test_array)
+        self.assertListEqual([[1, 0], [0, 2]], result.tolist())
+        self.assertEqual(np.float32, result.dtype)
+        self.assertTrue(np.isnan(self.test_array[0, 1]))
+
+    def test_transform_in_place(self):
+        result = NanToZeroTransformer(copy=False).fit_transform(self.test_array)
+        self.assertIs(self.test_array, result)
+        self.assertListEqual([[1, 0], [0, 2]], self.test_array.tolist())
+
+    def test_transform_dataframe(self):
+        test_df = pd.DataFrame({'col1': [1, np.nan], 'col2': ['a', 'b']})
+        result = NanToZeroTransformer().fit_transform(test_df)
+        self.assertListEqual(['col1', 'col2'], list(result.columns))
+        self.assertListEqual([1, 0], list(result['col1']))
+
+    def test_transform_sparse(self):
+        test_matrix = sp.csr_matrix(self.test_array)
+        result = NanToZeroTransformer(copy=False).fit_transform(test_matrix)
+        self.assertTrue(sp.isspmatrix_csr(result))
+        self.assertListEqual([[1, 0], [0, 2]], result.toarray().tolist())
@@ -0,0 +1,111 @@
+from unittest import TestCase, skipIf, skipUnless
+from kaggle import data_loader
+from kaggle import settings
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+import json
+import os
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class BaseDataLoaderTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, 'data'))
+        self.settings = self._write_settings(string_features=['s'], numeric_features=['n'])
+        data = pd.DataFrame({'id': [1, 2, 3], 'ignored': ['x', 'y', 'z'], 's': ['a', 'b', 'a'],
+                             'letters': ['AB', 'C', 'DEF'], 'n': [1.5, np.nan, 3], 'target': [0, 1, 0]})
+        data.to_csv(self.settings.train_file_path, index=False)
+        data.drop('target', axis=1).to_csv(self.settings.test_file_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_settings(self, string_features, numeric_features):
+        settings_path = os.path.join(self.directory, 'SETTINGS.json')
+        with open(settings_path, 'w') as f:
+            json.dump({'competition_name': 'unit_test', 'data_directory_name': 'data', 'train_file': 'train.csv',
+                       'test_file': 'test.csv', 'saved_object_directory_name': 'saved',
+                       'submission_directory_name': 'submissions', 'logging_config_file': 'logging.conf',
+                       'data_info': {'non_features': ['ignored'], 'string_features': string_features,
+                                     'special_string_features': ['letters'], 'numeric_features': numeric_features,
+                                     'target': 'target', 'record_pk': 'id'}}, f)
+        return settings.Settings(settings_path)
+
+    def _load_train_counting_csv_reads(self, the_settings, cache_format):
+        """
+        Returns the loaded train frame and the number of times the CSV was read
+        """
+        original_read_csv = data_loader._read_csv
+        reads = []
+        def counting_read_csv(*args):
+            reads.append(args)
+            return original_read_csv(*args)
+        data_loader._read_csv = counting_read_csv
+        try:
+            return data_loader.load_train(the_settings, cache_format=cache_format), len(reads)
+        finally:
+            data_loader._read_csv = original_read_csv
+
+
+class TestDataLoader(BaseDataLoaderTestCase):
+    def test_load_train(self):
+        result = data_loader.load_train(self.settings, cache_format=None)
+        self.assertListEqual(['id', 's', 'n', 'letters', 'target'], list(result.columns))
+        self.assertEqual('category', result['s'].dtype.name)
+        self.assertEqual(np.float32, result['n'].dtype)
+        self.assertListEqual(['AB', 'C', 'DEF'], list(result['letters']))
+
+    def test_load_test_has_no_target(self):
+        result = data_loader.load_test(self.settings, cache_format=None)
+        self.assertListEqual(['id', 's', 'n', 'letters'], list(result.columns))
+
+    def test_chunks(self):
+        chunks = list(data_loader.load_train(self.settings, chunksize=2))
+        self.assertListEqual([2, 1], [len(chunk) for chunk in chunks])
+        self.assertEqual(np.float32, chunks[0]['n'].dtype)
+
+    @skipUnless(pyarrow, 'pyarrow not installed')
+    def test_cache_written_and_used(self):
+        for cache_format in [data_loader.CACHE_PARQUET, data_loader.CACHE_FEATHER]:
+            first, first_reads = self._load_train_counting_csv_reads(self.settings, cache_format)
+            cache_path = data_loader.get_cache_path(self.settings.train_file_path,
+                                                    data_loader.get_columns(self.settings),
+                                                    data_loader.get_dtypes(self.settings), cache_format)
+            self.assertTrue(os.path.exists(cache_path))
+            second, second_reads = self._load_train_counting_csv_reads(self.settings, cache_format)
+            self.assertEqual((1, 0), (first_reads, second_reads))
+            self.assertEqual('category', second['s'].dtype.name)
+            self.assertTrue(first.equals(second))
+
+    @skipUnless(pyarrow, 'pyarrow not installed')
+    def test_cache_invalidated_by_dtypes(self):
+        first, first_reads = self._load_train_counting_csv_reads(self.settings, data_loader.CACHE_PARQUET)
+        changed_settings = self._write_settings(string_features=['s', 'n'], numeric_features=[])
+        second, second_reads = self._load_train_counting_csv_reads(changed_settings, data_loader.CACHE_PARQUET)
+        self.assertEqual((1, 1), (first_reads, second_reads))
+        self.assertEqual(np.float32, first['n'].dtype)
+        self.assertEqual('category', second['n'].dtype.name)
+        self.assertEqual(2, len([file_name for file_name in os.listdir(os.path.join(self.directory, 'data'))
+                                 if file_name.endswith('.parquet')]))
+
+    @skipUnless(pyarrow, 'pyarrow not installed')
+    def test_cache_invalidated_by_newer_csv(self):
+        self._load_train_counting_csv_reads(self.settings, data_loader.CACHE_PARQUET)
+        mtime = os.path.getmtime(self.settings.train_file_path) + 10
+        os.utime(self.settings.train_file_path, (mtime, mtime))
+        result, reads = self._load_train_counting_csv_reads(self.settings, data_loader.CACHE_PARQUET)
+        self.assertEqual(1, reads)
+        self.assertEqual(3, len(result))
+
+    @skipIf(pyarrow is not None, 'pyarrow installed, the cache is always written')
+    def test_no_cache_without_engine(self):
+        result = data_loader.load_train(self.settings)
+        self.assertEqual(3, len(result))
+        self.assertListEqual(['test.csv', 'train.csv'], sorted(os.listdir(os.path.join(self.directory, 'data'))))
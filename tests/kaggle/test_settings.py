@@ -1,5 +1,13 @@
 from unittest import TestCase
 from kaggle import settings
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+import tempfile
+import shutil
+import json
+import os
 
 class BaseSettingsTestCase(TestCase):
     def setUp(self):
@@ -12,7 +20,69 @@ class BaseSettingsTestCase(TestCase):
 class TestSettings(BaseSettingsTestCase):
 
     def test_test_file_paths(self):
-        self.assertEqual(self.settings.train_file_path,'..\\data\\train.csv')
+        self.assertEqual(self.settings.train_file_path, os.path.join(os.path.abspath(os.pardir), 'data', 'train.csv'))
 
     def test_train_file_paths(self):
-        self.assertEqual(self.settings.test_file_path, '..\\data\\test.csv')
+        self.assertEqual(self.settings.test_file_path, os.path.join(os.path.abspath(os.pardir), 'data', 'test.csv'))
+
+
+class BaseSettingsFileTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_path = os.path.join(self.directory, 'SETTINGS.json')
+        self._write_settings('first')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_settings(self, competition_name, mtime=None):
+        with open(self.settings_path, 'w') as f:
+            json.dump({'competition_name': competition_name, 'data_directory_name': 'data', 'train_file': 'train.csv',
+                       'test_file': 'test.csv', 'saved_object_directory_name': 'saved',
+                       'submission_directory_name': 'submissions', 'logging_config_file': 'logging.conf',
+                       'data_info': {'non_features': ['id'], 'string_features': ['s'], 'special_string_features': [],
+                                     'numeric_features': ['n'], 'target': 'target', 'record_pk': 'id'}}, f)
+        if mtime is not None:
+            os.utime(self.settings_path, (mtime, mtime))
+
+
+class TestGetSettings(BaseSettingsFileTestCase):
+    def test_paths_relative_to_settings_file(self):
+        the_settings = settings.get_settings(self.settings_path)
+        self.assertEqual(os.path.join(self.directory, 'data', 'train.csv'), the_settings.train_file_path)
+        self.assertListEqual(['s', 'n'], the_settings.all_features)
+
+    def test_relative_path_made_absolute(self):
+        current_directory = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            the_settings = settings.Settings(settings.SETTINGS_FILE_NAME)
+            expected = os.path.join(os.getcwd(), 'data', 'train.csv')
+        finally:
+            os.chdir(current_directory)
+        self.assertEqual(expected, the_settings.train_file_path)
+        self.assertEqual(expected, pickle.loads(pickle.dumps(the_settings)).train_file_path)
+
+    def test_cached_until_file_changes(self):
+        self._write_settings('first', mtime=1000000)
+        the_settings = settings.get_settings(self.settings_path)
+        self.assertIs(the_settings, settings.get_settings(self.settings_path))
+
+        self._write_settings('second', mtime=2000000)
+        changed_settings = settings.get_settings(self.settings_path)
+        self.assertIsNot(the_settings, changed_settings)
+        self.assertEqual('second', changed_settings.competiton_name)
+
+    def test_environment_variable(self):
+        os.environ[settings.SETTINGS_PATH_VARIABLE] = self.settings_path
+        try:
+            self.assertEqual(self.settings_path, settings.find_settings_file())
+        finally:
+            del os.environ[settings.SETTINGS_PATH_VARIABLE]
+
+    def test_pickle(self):
+        the_settings = settings.Settings(self.settings_path)
+        self.assertEqual('s', the_settings.string_features[0])
+        copied = pickle.loads(pickle.dumps(the_settings))
+        self.assertNotIn('string_features', copied.__dict__)
+        self.assertEqual(the_settings.test_file_path, copied.test_file_path)
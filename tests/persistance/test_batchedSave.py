@@ -0,0 +1,78 @@
+from unittest import TestCase
+from persistance.execution_context import PersistModel
+from persistance.execution_context import GridScore
+from persistance.backends import SQLiteBackend
+import tempfile
+import shutil
+import os
+import numpy as np
+
+
+class _CountingConnection(object):
+    """
+    Wraps a connection and records the number of rows sent per executemany
+    """
+    def __init__(self, connection):
+        self._connection = connection
+        self.batches = []
+
+    def cursor(self):
+        return _CountingCursor(self._connection.cursor(), self.batches)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class _CountingCursor(object):
+    def __init__(self, cursor, batches):
+        self._cursor = cursor
+        self._batches = batches
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        self._batches.append(len(rows))
+        return self._cursor.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class BaseBatchedSaveTestCase(TestCase):
+    def setUp(self):
+        self.file_loc = tempfile.mkdtemp()
+        self.project_name = 'unit_test'
+        self.backend = SQLiteBackend(os.path.join(self.file_loc, 'runs.db'), batch_size=2)
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.file_loc, ignore_errors=True)
+
+    def _count(self, table, run_id):
+        return self.backend._query('SELECT COUNT(*) FROM {} WHERE run_id = %s'.format(table), [run_id])[0][0]
+
+
+class TestBatchedSave(BaseBatchedSaveTestCase):
+    def test_rows_sent_in_batches(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        for note in range(5):
+            model_persistor.add_note('Note {}'.format(note))
+        connection = _CountingConnection(self.backend._db)
+        self.backend._db = connection
+        try:
+            model_persistor.save_all_run_notes()
+        finally:
+            self.backend._db = connection._connection
+        self.assertListEqual([2, 2, 1], connection.batches)
+        self.assertEqual(5, self._count('model_run_notes', model_persistor.run_id))
+
+    def test_failed_save_all_rolled_back(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_note('Note 1')
+        model_persistor.add_score('test', .25)
+        model_persistor.add_grid_scores([GridScore({'C': 1}, 'not a number', np.array([.5, .5]))])
+        with self.assertRaises(Exception):
+            model_persistor.save_all()
+
+        self.assertEqual(0, self._count('model_run_notes', model_persistor.run_id))
+        self.assertEqual(0, self._count('model_scores', model_persistor.run_id))
+        self.assertEqual(0, self._count('grid_search_results', model_persistor.run_id))
@@ -0,0 +1,223 @@
+from unittest import TestCase
+from persistance import backends
+from persistance.backends import ConnectionPool, MySQLBackend
+from persistance.execution_context import PersistModel
+
+
+# The tables of a database created before the newer tables and columns
+_OLD_SCHEMA = {'model_runs': ['run_id', 'project_name', 'run_time_stamp'],
+               'model_run_object_info': ['run_id', 'sequence_num', 'obj_type', 'object_info', 'file_name'],
+               'grid_search_results': ['run_id', 'mean', 'std', 'params']}
+
+
+def _current_schema():
+    ret = dict((table, list(columns)) for table, columns in _OLD_SCHEMA.items())
+    for table, statement in MySQLBackend._ADDED_TABLES:
+        ret[table] = []
+    for table, column, definition in MySQLBackend._ADDED_COLUMNS:
+        ret[table].append(column)
+    return ret
+
+
+class _FakeCursor(object):
+    lastrowid = 1
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._result = []
+
+    def execute(self, sql, params=None):
+        self._connection.executed.append(sql)
+        if self._connection.read_only and sql.lstrip().startswith(('CREATE', 'ALTER')):
+            raise Exception('command denied to user')
+        if sql.startswith('SELECT @@hostname'):
+            self._result = [('test_host', 3306, 'analysis_results')]
+        elif 'information_schema.tables' in sql:
+            self._result = [(table,) for table in self._connection.schema]
+        elif 'information_schema.columns' in sql:
+            self._result = [(column,) for column in self._connection.schema.get(params[0], [])]
+        elif sql.startswith('SELECT GET_LOCK') or sql.startswith('SELECT RELEASE_LOCK'):
+            self._result = [(1,)]
+        else:
+            self._result = []
+
+    def fetchone(self):
+        return (self._connection.max_allowed_packet,)
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class _FakeConnection(object):
+    def __init__(self, max_allowed_packet=1024 * 1024 * 1024, schema=None, read_only=False):
+        self.max_allowed_packet = max_allowed_packet
+        self.schema = _OLD_SCHEMA if schema is None else schema
+        self.read_only = read_only
+        self.healthy = True
+        self.closed = False
+        self.executed = []
+
+    def ping(self):
+        if not self.healthy:
+            raise Exception('MySQL server has gone away')
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def set_character_set(self, charset):
+        pass
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+
+class _FakeMySQLdb(object):
+    def __init__(self):
+        self.connections = []
+
+    def connect(self, **connection_info):
+        connection = _FakeConnection(max_allowed_packet=1024)
+        self.connections.append(connection)
+        return connection
+
+
+class BaseConnectionPoolTestCase(TestCase):
+    def setUp(self):
+        self.connection_info = {'host': 'test_host', 'port': 3306, 'user': 'user', 'db': 'analysis_results'}
+        self.original_mysqldb = backends.MySQLdb
+        self.mysqldb = _FakeMySQLdb()
+        backends.MySQLdb = self.mysqldb
+        backends._pools.clear()
+        backends._packet_size_checked.clear()
+        backends._schema_upgraded.clear()
+
+    def tearDown(self):
+        backends.MySQLdb = self.original_mysqldb
+        backends._pools.clear()
+        backends._packet_size_checked.clear()
+        backends._schema_upgraded.clear()
+
+
+class TestConnectionPool(BaseConnectionPoolTestCase):
+    def test_idle_connection_reused(self):
+        pool = ConnectionPool(self.connection_info)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(connection, pool.acquire())
+        self.assertEqual(1, len(self.mysqldb.connections))
+
+    def test_broken_connection_replaced(self):
+        pool = ConnectionPool(self.connection_info)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.healthy = False
+        replacement = pool.acquire()
+        self.assertIsNot(connection, replacement)
+        self.assertTrue(connection.closed)
+
+    def test_max_size(self):
+        pool = ConnectionPool(self.connection_info, max_size=2)
+        connections = [pool.acquire() for i in range(3)]
+        for connection in connections:
+            pool.release(connection)
+        self.assertListEqual([False, False, True], [connection.closed for connection in connections])
+
+    def test_pool_per_process(self):
+        pool = backends.get_pool(self.connection_info)
+        self.assertIs(pool, backends.get_pool(self.connection_info))
+        original_getpid = backends.os.getpid
+        backends.os.getpid = lambda: original_getpid() + 1
+        try:
+            self.assertIsNot(pool, backends.get_pool(self.connection_info))
+        finally:
+            backends.os.getpid = original_getpid
+
+    def test_packet_size_checked_once_per_server(self):
+        pool = ConnectionPool(self.connection_info)
+        first, second = pool.acquire(), pool.acquire()
+        self.assertEqual(2, len(first.executed))
+        self.assertTrue(first.executed[1].startswith('SET @@global.max_allowed_packet'))
+        self.assertListEqual([], second.executed)
+
+        other_server = ConnectionPool(dict(self.connection_info, host='other_host')).acquire()
+        self.assertEqual(2, len(other_server.executed))
+
+
+class TestSchemaUpgrade(BaseConnectionPoolTestCase):
+    def _schema_statements(self, connection):
+        return [sql for sql in connection.executed if sql.lstrip().startswith(('CREATE', 'ALTER'))]
+
+    def test_upgraded_once_per_database(self):
+        first = MySQLBackend(connection_info=self.connection_info)
+        statements = self._schema_statements(first._db)
+        executed = first._db.executed
+        self.assertLess(executed.index('SELECT GET_LOCK(%s, %s)'), executed.index(statements[0]))
+        self.assertLess(executed.index(statements[-1]), executed.index('SELECT RELEASE_LOCK(%s)'))
+        self.assertEqual(len(MySQLBackend._ADDED_TABLES) + len(MySQLBackend._ADDED_COLUMNS), len(statements))
+        first.close()
+
+        second = MySQLBackend(connection_info=dict(self.connection_info, user='other_user'))
+        self.assertListEqual([], self._schema_statements(second._db))
+
+    def test_passed_connection_upgraded_once(self):
+        first_connection, second_connection = _FakeConnection(), _FakeConnection()
+        MySQLBackend(connection=first_connection)
+        MySQLBackend(connection=second_connection)
+        self.assertNotEqual([], self._schema_statements(first_connection))
+        self.assertListEqual([], self._schema_statements(second_connection))
+
+        del second_connection.executed[:]
+        MySQLBackend(connection=second_connection)
+        self.assertListEqual([], second_connection.executed)
+
+    def test_up_to_date_schema_not_changed(self):
+        connection = _FakeConnection(schema=_current_schema(), read_only=True)
+        metadata = PersistModel.load_runs(run_ids=[1], connection=connection)
+        self.assertEqual(0, len(metadata.runs))
+        self.assertListEqual([], self._schema_statements(connection))
+        self.assertNotIn('SELECT GET_LOCK(%s, %s)', connection.executed)
+
+    def test_only_missing_columns_added(self):
+        schema = _current_schema()
+        schema['grid_search_results'].remove('cv_scores')
+        connection = _FakeConnection(schema=schema)
+        MySQLBackend(connection=connection)
+        self.assertListEqual(['ALTER TABLE grid_search_results ADD COLUMN cv_scores TEXT NULL'],
+                             self._schema_statements(connection))
+
+    def test_upgrade_without_privileges(self):
+        with self.assertRaises(Exception) as context:
+            MySQLBackend(connection=_FakeConnection(read_only=True))
+        self.assertIn('upgrade_schema()', str(context.exception))
+
+
+class TestPassedConnection(BaseConnectionPoolTestCase):
+    def test_load_runs_leaves_connection_open(self):
+        connection = _FakeConnection()
+        PersistModel.load_runs(run_ids=[1], connection=connection)
+        self.assertFalse(connection.closed)
+
+
+    def test_load_grid_results_leaves_connection_open(self):
+        connection = _FakeConnection()
+        PersistModel.load_grid_results(run_ids=[1], connection=connection)
+        self.assertFalse(connection.closed)
+
+    def test_find_runs_leaves_connection_open(self):
+        connection = _FakeConnection()
+        PersistModel.find_runs(parameter='columns', connection=connection)
+        self.assertFalse(connection.closed)
+
+    def test_persist_model_close_leaves_connection_open(self):
+        connection = _FakeConnection()
+        PersistModel(project_name='test', object_file_location='.', connection=connection).close()
+        self.assertFalse(connection.closed)
@@ -0,0 +1,39 @@
+from unittest import TestCase
+from persistance.object_cache import ObjectCache, estimate_size
+import numpy as np
+import pandas as pd
+
+
+class BaseObjectCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = ObjectCache(max_bytes=100)
+
+    def tearDown(self):
+        self.cache.clear()
+
+
+class TestObjectCache(BaseObjectCacheTestCase):
+    def test_least_recently_used_evicted(self):
+        self.cache.put('a', 'A', size=40)
+        self.cache.put('b', 'B', size=40)
+        self.assertEqual('A', self.cache.get('a'))
+        self.cache.put('c', 'C', size=40)
+        self.assertNotIn('b', self.cache)
+        self.assertEqual('A', self.cache.get('a'))
+        self.assertEqual('C', self.cache.get('c'))
+        self.assertEqual(80, self.cache.current_bytes)
+
+    def test_too_big_not_cached(self):
+        self.cache.put('a', 'A', size=101)
+        self.assertEqual(0, len(self.cache))
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_replacing_key(self):
+        self.cache.put('a', 'A', size=40)
+        self.cache.put('a', 'AA', size=50)
+        self.assertEqual('AA', self.cache.get('a'))
+        self.assertEqual(50, self.cache.current_bytes)
+
+    def test_estimate_size(self):
+        self.assertEqual(800, estimate_size(np.ones(100)))
+        self.assertGreaterEqual(estimate_size(pd.DataFrame({'a': np.ones(100)})), 800)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+from persistance.object_store import ObjectStore
+from persistance import serialization
+import tempfile
+import shutil
+import os
+import numpy as np
+import pandas as pd
+
+
+class BaseObjectStoreTestCase(TestCase):
+    def setUp(self):
+        self.file_loc = tempfile.mkdtemp()
+        self.store = ObjectStore(self.file_loc)
+
+    def tearDown(self):
+        shutil.rmtree(self.file_loc, ignore_errors=True)
+
+
+class TestObjectStore(BaseObjectStoreTestCase):
+    def test_put_and_load(self):
+        relative_path = self.store.put({'a': [1, 2, 3]})
+        digest = serialization.object_digest({'a': [1, 2, 3]})
+        self.assertEqual('objects/{}/{}.pkl.gz'.format(digest[:2], digest), relative_path)
+        self.assertEqual({'a': [1, 2, 3]}, serialization.load_object(self.store.path(relative_path)))
+
+    def test_identical_objects_share_a_file(self):
+        first = self.store.put(pd.DataFrame({'a': np.arange(5)}), serialization.CODEC_ARRAY)
+        second = self.store.put(pd.DataFrame({'a': np.arange(5)}), serialization.CODEC_ARRAY)
+        self.assertEqual(first, second)
+        self.assertTrue(first.endswith('.frame'))
+        self.assertListEqual([first], self.store.stored_files())
+        self.assertListEqual([], os.listdir(os.path.join(self.file_loc, 'objects', 'tmp')))
+
+    def test_collect_garbage(self):
+        kept = self.store.put('kept')
+        dropped = self.store.put('dropped')
+        self.assertListEqual([], self.store.collect_garbage({kept: 1}))
+        self.assertListEqual([dropped], self.store.collect_garbage({kept: 1, dropped: 0}, min_age=0))
+        self.assertListEqual([kept], self.store.stored_files())
+
+    def test_put_serializes_once(self):
+        original_dump = serialization.dump
+        calls = []
+        def counting_dump(obj, f):
+            calls.append(obj)
+            original_dump(obj, f)
+        serialization.dump = counting_dump
+        try:
+            self.store.put({'a': [1, 2, 3]})
+            self.store.put({'a': [1, 2, 3]})
+        finally:
+            serialization.dump = original_dump
+        self.assertEqual(2, len(calls))
+        self.assertEqual(1, len(self.store.stored_files()))
+
+    def test_collect_garbage_refuses_shared_store(self):
+        dropped = self.store.put('dropped')
+        self.store.add_owner('sqlite:///first.db')
+        self.assertListEqual([dropped], self.store.collect_garbage({}, min_age=0, owner='sqlite:///first.db'))
+
+        self.store.put('dropped')
+        ObjectStore(self.file_loc).add_owner('sqlite:///second.db')
+        self.assertListEqual(['sqlite:///first.db', 'sqlite:///second.db'], self.store.owners())
+        with self.assertRaises(Exception):
+            self.store.collect_garbage({}, min_age=0, owner='sqlite:///first.db')
+        self.assertListEqual([dropped], self.store.stored_files())
+
+    def test_snapshot_matches_put(self):
+        obj = {'a': [1, 2, 3]}
+        snapshot = self.store.snapshot(obj)
+        obj['a'].append(4)
+        relative_path = snapshot.write()
+        self.assertEqual(self.store.put({'a': [1, 2, 3]}), relative_path)
+        self.assertEqual({'a': [1, 2, 3]}, serialization.load_object(self.store.path(relative_path)))
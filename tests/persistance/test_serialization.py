@@ -0,0 +1,132 @@
+from unittest import TestCase
+from persistance import serialization
+import numpy as np
+import pandas as pd
+import tempfile
+import shutil
+import gzip
+import os
+
+
+class BaseSerializationTestCase(TestCase):
+    def setUp(self):
+        self.file_loc = tempfile.mkdtemp()
+        self.something_to_save = {'array': np.arange(10000, dtype=np.float32), 'note': 'some note', 'nested': [1, 2, 3]}
+
+    def tearDown(self):
+        shutil.rmtree(self.file_loc, ignore_errors=True)
+
+    def assertLoadedMatches(self, loaded):
+        self.assertTrue(np.array_equal(self.something_to_save['array'], loaded['array']))
+        self.assertEqual(np.float32, loaded['array'].dtype)
+        self.assertEqual(self.something_to_save['note'], loaded['note'])
+        self.assertListEqual(self.something_to_save['nested'], loaded['nested'])
+
+
+class TestSerialization(BaseSerializationTestCase):
+    def test_round_trip_all_codecs(self):
+        for codec in serialization.available_codecs():
+            file_path = serialization.save_object(self.something_to_save, os.path.join(self.file_loc, 'obj'), codec)
+            self.assertEqual(codec, serialization.codec_from_file_name(file_path))
+            self.assertLoadedMatches(serialization.load_object(file_path))
+
+    def test_compression_level(self):
+        file_path = serialization.save_object(self.something_to_save, os.path.join(self.file_loc, 'obj'),
+                                              serialization.CODEC_GZIP, level=1)
+        self.assertLoadedMatches(serialization.load_object(file_path))
+
+    def test_load_original_gzipped_pickle(self):
+        file_path = os.path.join(self.file_loc, 'R000001_20160411_120000_train_feature_00')
+        with gzip.open(file_path, 'wb') as f:
+            serialization.pickle.dump(self.something_to_save, f, -1)
+        self.assertIsNone(serialization.codec_from_file_name(file_path))
+        self.assertLoadedMatches(serialization.load_object(file_path))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(Exception):
+            serialization.save_object(self.something_to_save, os.path.join(self.file_loc, 'obj'), 'bzip')
+
+
+class TestArrayFormat(BaseSerializationTestCase):
+    def test_array_is_memory_mapped(self):
+        array = np.arange(20, dtype=np.float64).reshape(10, 2)
+        file_path = serialization.save_object(array, os.path.join(self.file_loc, 'obj'), serialization.CODEC_ARRAY)
+        loaded = serialization.load_object(file_path)
+        self.assertTrue(isinstance(loaded, np.memmap))
+        self.assertTrue(np.array_equal(array, loaded))
+
+    def test_dataframe_round_trip(self):
+        test_df = pd.DataFrame({'col1': [1.0, 2.0, 3.0], 'col2': [4, 5, 6], 'col3': [0.5, 0.25, 0.125]},
+                               index=pd.Index([10, 20, 30], name='id'))
+        file_path = serialization.save_object(test_df, os.path.join(self.file_loc, 'obj'), serialization.CODEC_ARRAY)
+        loaded = serialization.load_object(file_path)
+        self.assertTrue(test_df.equals(loaded))
+        self.assertEqual('id', loaded.index.name)
+
+    def test_series_round_trip(self):
+        test_series = pd.Series([0, 1, 1, 0], name='target')
+        file_path = serialization.save_object(test_series, os.path.join(self.file_loc, 'obj'), serialization.CODEC_ARRAY)
+        self.assertTrue(test_series.equals(serialization.load_object(file_path)))
+
+    def test_supports_array_format(self):
+        self.assertTrue(serialization.supports_array_format(np.zeros((2, 2))))
+        self.assertTrue(serialization.supports_array_format(pd.DataFrame({'col1': [1.0]})))
+        self.assertFalse(serialization.supports_array_format(self.something_to_save))
+
+    def test_special_indexes_round_trip(self):
+        indexes = [pd.date_range('2016-04-11', periods=3, tz='US/Eastern', name='time'),
+                   pd.MultiIndex.from_tuples([('a', 1), ('a', 2), ('b', 1)], names=['letter', 'number']),
+                   pd.CategoricalIndex(['x', 'y', 'x'], name='category'),
+                   pd.date_range('2016-04-11', periods=3, freq='D'),
+                   pd.Index(['a', 'b', 'c'], dtype=object, name='id')]
+        for position, index in enumerate(indexes):
+            test_df = pd.DataFrame({'col1': [1.0, 2.0, 3.0]}, index=index)
+            test_df.columns.name = 'columns'
+            file_path = serialization.save_object(test_df, os.path.join(self.file_loc, 'obj_{}'.format(position)),
+                                                  serialization.CODEC_ARRAY if serialization.supports_array_format(test_df)
+                                                  else serialization.CODEC_GZIP)
+            pd.testing.assert_frame_equal(test_df, serialization.load_object(file_path))
+
+    def test_special_indexes_not_array_format(self):
+        self.assertFalse(serialization.supports_array_format(
+            pd.Series([1.0, 2.0], index=pd.date_range('2016-04-11', periods=2, tz='UTC'))))
+        self.assertFalse(serialization.supports_array_format(
+            pd.DataFrame({'col1': [1.0, 2.0]}, index=pd.MultiIndex.from_tuples([('a', 1), ('b', 1)]))))
+        self.assertFalse(serialization.supports_array_format(
+            pd.DataFrame({'col1': [1.0, 2.0]}, index=pd.CategoricalIndex(['x', 'y']))))
+
+    def test_labels_json_can_not_store_round_trip(self):
+        objects = [pd.Series([1.0, 2.0], name=np.int64(3)),
+                   pd.DataFrame({'col1': [1.0, 2.0]}, index=pd.Index([10, 20], name=('id', 1))),
+                   pd.DataFrame({True: [1.0, 2.0], False: [3.0, 4.0]})]
+        for position, obj in enumerate(objects):
+            self.assertFalse(serialization.supports_array_format(obj))
+            file_path = serialization.save_object(obj, os.path.join(self.file_loc, 'obj_{}'.format(position)),
+                                                  serialization.CODEC_ARRAY if serialization.supports_array_format(obj)
+                                                  else serialization.CODEC_GZIP)
+            loaded = serialization.load_object(file_path)
+            self.assertTrue(obj.equals(loaded))
+            if isinstance(obj, pd.Series):
+                self.assertEqual(type(obj.name), type(loaded.name))
+            else:
+                self.assertEqual(obj.index.name, loaded.index.name)
+                self.assertListEqual([type(col) for col in obj.columns], [type(col) for col in loaded.columns])
+
+    def test_failed_save_leaves_nothing_behind(self):
+        with self.assertRaises(ValueError):
+            serialization.save_object(pd.Series([1.0, 2.0], name=np.int64(3)), os.path.join(self.file_loc, 'obj'),
+                                      serialization.CODEC_ARRAY)
+        self.assertListEqual([], os.listdir(self.file_loc))
+
+        original_save_frame = serialization._save_frame
+        def failing_save_frame(obj, file_path, the_hash=None):
+            original_save_frame(obj, file_path, the_hash)
+            raise IOError('disk full')
+        serialization._save_frame = failing_save_frame
+        try:
+            with self.assertRaises(IOError):
+                serialization.save_object(pd.DataFrame({'col1': [1.0]}), os.path.join(self.file_loc, 'obj'),
+                                          serialization.CODEC_ARRAY)
+        finally:
+            serialization._save_frame = original_save_frame
+        self.assertListEqual([], os.listdir(self.file_loc))
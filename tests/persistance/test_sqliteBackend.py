@@ -0,0 +1,278 @@
+from unittest import TestCase
+from persistance.execution_context import PersistModel
+from persistance.execution_context import FileObjectType
+from persistance.execution_context import GridScore
+from persistance.backends import SQLiteBackend
+from persistance import backends
+import tempfile
+import shutil
+import sqlite3
+import os
+import numpy as np
+from sklearn.pipeline import FeatureUnion
+from data_preparation.transformers import LetterExtractionTransformer, NaNCountTransformer
+
+
+class BaseSQLiteBackendTestCase(TestCase):
+    def setUp(self):
+        self.file_loc = tempfile.mkdtemp()
+        self.project_name = 'unit_test'
+        self.backend = SQLiteBackend(os.path.join(self.file_loc, 'runs.db'))
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.file_loc, ignore_errors=True)
+
+
+class TestSQLiteBackend(BaseSQLiteBackendTestCase):
+    def test_new_runs_get_new_ids(self):
+        first = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        second = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        self.assertEqual(first.run_id + 1, second.run_id)
+
+    def test_save_and_load(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_note("Note 1")
+        model_persistor.add_note("Note 2")
+        model_persistor.add_score('test', .25)
+        model_persistor.add_object_to_save({'a': [1, 2, 3]}, FileObjectType.train_feature)
+        model_persistor.save_all()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+
+        self.assertEqual(model_persistor.project_name, model_getter.project_name)
+        self.assertEqual(model_persistor.run_time_stamp(), model_getter.run_time_stamp())
+        self.assertListEqual(model_persistor.notes, model_getter.notes)
+        self.assertEqual(model_persistor.scores, model_getter.scores)
+        self.assertEqual({'a': [1, 2, 3]}, model_getter.get_object(FileObjectType.train_feature))
+
+    def test_missing_run(self):
+        with self.assertRaises(Exception):
+            PersistModel(project_name=self.project_name, object_file_location=self.file_loc, run_id=1000, backend=self.backend)
+
+    def test_train_feature_array_is_memory_mapped(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_object_to_save(np.ones((5, 3)), FileObjectType.train_feature)
+        model_persistor.save_all()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+        loaded = model_getter.get_object(FileObjectType.train_feature)
+        self.assertTrue(isinstance(loaded, np.memmap))
+        self.assertTrue(np.array_equal(np.ones((5, 3)), loaded))
+
+    def test_background_save(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_note("Note 1")
+        model_persistor.add_score('test', .25)
+        model_persistor.add_object_to_save({'a': [1, 2, 3]}, FileObjectType.train_feature)
+        future = model_persistor.save_all(background=True)
+        model_persistor.flush()
+        self.assertTrue(future.done())
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+        self.assertListEqual(model_persistor.notes, model_getter.notes)
+        self.assertEqual(model_persistor.scores, model_getter.scores)
+        self.assertEqual({'a': [1, 2, 3]}, model_getter.get_object(FileObjectType.train_feature))
+
+    def test_background_save_error_raised_on_flush(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_grid_scores([GridScore({'C': 1}, 'not a number', np.array([.5, .5]))])
+        model_persistor.save_all(background=True)
+        with self.assertRaises(Exception):
+            model_persistor.flush()
+
+    def test_background_save_unpicklable_object_raised_straight_away(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_object_to_save(lambda x: x, FileObjectType.grid_search)
+        with self.assertRaises(Exception):
+            model_persistor.save_all(background=True)
+
+    def test_background_save_stores_state_at_call(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model = {'fold': 0}
+        features = np.zeros(5)
+        model_persistor.add_object_to_save(model, FileObjectType.grid_search)
+        model_persistor.add_object_to_save(features, FileObjectType.train_feature)
+        model_persistor.save_all(background=True)
+        model['fold'] = 1
+        features[:] = 1
+        model_persistor.flush()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+        self.assertEqual({'fold': 0}, model_getter.get_object(FileObjectType.grid_search))
+        self.assertTrue(np.array_equal(np.zeros(5), model_getter.get_object(FileObjectType.train_feature)))
+
+    def test_several_objects_of_a_type(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        for fold in range(3):
+            model_persistor.add_object_to_save({'fold': fold}, FileObjectType.grid_search, label='fold_{}'.format(fold))
+        model_persistor.save_all()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+        with self.assertRaises(Exception):
+            model_getter.get_object(FileObjectType.grid_search)
+        self.assertEqual({'fold': 1}, model_getter.get_object(FileObjectType.grid_search, label='fold_1'))
+        self.assertEqual({'fold': 2}, model_getter.get_object(FileObjectType.grid_search, sequence_num=2))
+        self.assertListEqual([{'fold': 0}, {'fold': 1}, {'fold': 2}],
+                             list(model_getter.get_objects(FileObjectType.grid_search)))
+
+    def test_loaded_objects_are_cached_within_budget(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        for fold in range(3):
+            model_persistor.add_object_to_save(np.ones(100) * fold, FileObjectType.grid_search)
+        model_persistor.save_all()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend, cache_max_bytes=1000)
+        first = model_getter.get_object(FileObjectType.grid_search, sequence_num=0)
+        self.assertIs(first, model_getter.get_object(FileObjectType.grid_search, sequence_num=0))
+        for obj in model_getter.get_objects(FileObjectType.grid_search):
+            pass
+        self.assertEqual(1, len(model_getter._object_cache))
+        self.assertIsNot(first, model_getter.get_object(FileObjectType.grid_search, sequence_num=0))
+
+    def test_label_column_added_to_old_database(self):
+        self.backend.close()
+        database_path = os.path.join(self.file_loc, 'old.db')
+        connection = sqlite3.connect(database_path)
+        connection.execute('CREATE TABLE model_run_object_info (run_id INTEGER, sequence_num INTEGER, '
+                           'obj_type TEXT, object_info TEXT, file_name TEXT)')
+        connection.commit()
+        connection.close()
+
+        self.backend = SQLiteBackend(database_path)
+        self.assertIn('label', self.backend._column_names('model_run_object_info'))
+
+    def test_identical_objects_stored_once(self):
+        file_names = []
+        for run in range(2):
+            model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+            model_persistor.add_object_to_save(np.arange(10), FileObjectType.train_feature)
+            model_persistor.add_object_to_save({'run': run}, FileObjectType.grid_search)
+            model_persistor.save_all()
+            file_names.append([obj_info.file_name for obj_info in model_persistor._objects_to_save])
+
+        self.assertEqual(file_names[0][0], file_names[1][0])
+        self.assertNotEqual(file_names[0][1], file_names[1][1])
+        self.assertEqual(3, len(model_persistor._object_store.stored_files()))
+
+    def test_garbage_collection_after_delete(self):
+        runs = []
+        for run in range(2):
+            model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+            model_persistor.add_object_to_save(np.arange(10), FileObjectType.train_feature)
+            model_persistor.add_object_to_save({'run': run}, FileObjectType.grid_search)
+            model_persistor.save_all()
+            runs.append(model_persistor)
+
+        runs[0].delete_run()
+        self.assertListEqual([], runs[0].collect_garbage())
+        deleted = runs[0].collect_garbage(min_age=0)
+        self.assertListEqual([runs[0]._objects_to_save[1].file_name], deleted)
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=runs[1].run_id, backend=self.backend)
+        self.assertTrue(np.array_equal(np.arange(10), model_getter.get_object(FileObjectType.train_feature)))
+        with self.assertRaises(Exception):
+            PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                         run_id=runs[0].run_id, backend=self.backend)
+
+    def test_load_runs(self):
+        run_ids = []
+        for run in range(3):
+            model_persistor = PersistModel(project_name='project_{}'.format(run % 2), object_file_location=self.file_loc,
+                                           backend=self.backend)
+            model_persistor.add_score('auc', run / 10.0)
+            model_persistor.add_score('log_loss', run)
+            model_persistor.save_all()
+            run_ids.append(model_persistor.run_id)
+
+        metadata = PersistModel.load_runs(run_ids=run_ids[1:], backend=self.backend)
+        self.assertListEqual(run_ids[1:], list(metadata.runs['run_id']))
+        self.assertListEqual([.1, 1, .2, 2], list(metadata.scores['score']))
+        self.assertEqual(0, len(metadata.grid_scores))
+
+        metadata = PersistModel.load_runs(project_name='project_0', backend=self.backend)
+        self.assertListEqual([run_ids[0], run_ids[2]], list(metadata.runs['run_id']))
+
+        metadata = PersistModel.load_runs(run_id_range=(run_ids[0], run_ids[1]), project_name='project_1', backend=self.backend)
+        self.assertListEqual([run_ids[1]], list(metadata.runs['run_id']))
+        self.assertListEqual(['auc', 'log_loss'], list(metadata.scores['score_type']))
+
+    def test_load_runs_in_chunks(self):
+        run_ids = [PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                backend=self.backend).run_id for run in range(3)]
+        original_size = backends._IN_CLAUSE_SIZE
+        backends._IN_CLAUSE_SIZE = 2
+        try:
+            metadata = PersistModel.load_runs(run_ids=run_ids + [1000], backend=self.backend)
+        finally:
+            backends._IN_CLAUSE_SIZE = original_size
+        self.assertListEqual(run_ids, list(metadata.runs['run_id']))
+
+    def test_grid_scores_round_trip(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_grid_scores([GridScore({'C': 1.0, 'kernel': 'rbf'}, .5, np.array([.4, .6])),
+                                         GridScore({'C': np.float64(10)}, .7, np.array([.7, .7]))])
+        model_persistor.save_all()
+
+        model_getter = PersistModel(project_name=self.project_name, object_file_location=self.file_loc,
+                                    run_id=model_persistor.run_id, backend=self.backend)
+        self.assertEqual(2, len(model_getter.grid_scores))
+        self.assertEqual({'C': 1.0, 'kernel': 'rbf'}, model_getter.grid_scores[0].parameters)
+        self.assertEqual(.5, model_getter.grid_scores[0].mean_validation_score)
+        self.assertTrue(np.array_equal([.4, .6], model_getter.grid_scores[0].cv_validation_scores))
+
+    def test_grid_scores_with_different_fold_counts(self):
+        model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+        model_persistor.add_grid_scores([GridScore({'C': 1.0}, .5, np.array([.4, .6])),
+                                         GridScore({'C': 10.0}, .6, np.array([.5, .6, .7]))])
+        model_persistor.save_all()
+
+        results = PersistModel.load_grid_results(run_ids=[model_persistor.run_id], backend=self.backend)
+        self.assertListEqual([.1, round(np.std([.5, .6, .7]), 8)], list(results['std']))
+        self.assertTrue(np.isnan(results['split2_score'][0]))
+        self.assertEqual(.7, results['split2_score'][1])
+
+    def test_load_grid_results(self):
+        run_ids = []
+        for run in range(2):
+            model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+            model_persistor.add_grid_scores([GridScore({'C': 1.0 + run, 'kernel': 'rbf'}, .5, np.array([.4, .6]))])
+            model_persistor.save_all()
+            run_ids.append(model_persistor.run_id)
+        self.backend._insert_rows('INSERT INTO grid_search_results (run_id, mean, std, params) VALUES (%s, %s, %s, %s)',
+                                  [[run_ids[1], .3, 0, str({'C': 5.0, 'gamma': 2})]])
+
+        results = PersistModel.load_grid_results(run_ids=run_ids, backend=self.backend)
+        self.assertListEqual(['run_id', 'mean', 'std', 'param_C', 'param_gamma', 'param_kernel', 'split0_score',
+                              'split1_score'], list(results.columns))
+        self.assertListEqual([1.0, 2.0, 5.0], list(results['param_C']))
+        self.assertEqual(np.float64, results['param_C'].dtype)
+        self.assertTrue(np.isnan(results['split0_score'][2]))
+        self.assertListEqual(list(results['mean']),
+                             list(PersistModel.load_runs(run_ids=run_ids, backend=self.backend).grid_scores['mean']))
+
+    def test_find_runs(self):
+        run_ids = []
+        for column in ['X', 'Y']:
+            model_persistor = PersistModel(project_name=self.project_name, object_file_location=self.file_loc, backend=self.backend)
+            model_persistor.add_object_to_save(FeatureUnion([('letters', LetterExtractionTransformer([column, 'Z'])),
+                                                             ('nans', NaNCountTransformer())]),
+                                               FileObjectType.feature_model)
+            model_persistor.save_all()
+            run_ids.append(model_persistor.run_id)
+
+        self.assertListEqual(run_ids, PersistModel.find_runs(LetterExtractionTransformer, backend=self.backend))
+        self.assertListEqual([run_ids[0]], PersistModel.find_runs(LetterExtractionTransformer, 'columns', ['X', 'Z'],
+                                                                  backend=self.backend))
+        self.assertListEqual([run_ids[1]], PersistModel.find_runs(LetterExtractionTransformer, 'columns',
+                                                                  value_contains='"Y"', backend=self.backend))
+        self.assertListEqual(run_ids, PersistModel.find_runs(path='feature_model/nans', backend=self.backend))
+        self.assertListEqual([], PersistModel.find_runs(LetterExtractionTransformer, project_name='other',
+                                                        backend=self.backend))